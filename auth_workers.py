@@ -0,0 +1,160 @@
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+import numpy as np
+
+BCRYPT_ROUNDS = int(os.environ.get("EDA_BCRYPT_ROUNDS", 12))  ## cost factor for new hashes; older ones are upgraded at login
+AUTH_WORKERS = int(os.environ.get("EDA_AUTH_WORKERS", max(1, (os.cpu_count() or 2) // 2)))
+AUTH_QUEUE_MAX = int(os.environ.get("EDA_AUTH_QUEUE_MAX", 64))  ## requests queued or running; more are turned away
+AUTH_TIMEOUT = float(os.environ.get("EDA_AUTH_TIMEOUT", 10))  ## seconds a caller waits, queueing included
+LATENCY_WINDOW = 10_000
+
+
+class AuthBusy(RuntimeError):
+    """The auth workers cannot take the request: the queue is full, it timed out, or a worker crashed."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(AUTH_QUEUE_MAX)
+latencies = deque(maxlen=LATENCY_WINDOW)  ## seconds per request, queueing included
+
+
+def _get_pool():
+    ## bcrypt is CPU bound: run it in worker processes so script threads stay responsive
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(AUTH_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def _submit(fn, *args):
+    try:
+        return _get_pool().submit(fn, *args)
+    except BrokenProcessPool:
+        _reset_pool()
+        return _get_pool().submit(fn, *args)
+
+
+def _run(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise AuthBusy("Too many sign-in requests right now, please try again in a moment.")
+    start = time.perf_counter()
+    try:
+        try:
+            future = _submit(fn, *args)
+        except BaseException:
+            _slots.release()
+            raise
+        ## The slot is held until the job is done, not just until this caller stops waiting for it
+        future.add_done_callback(lambda f: _slots.release())
+        try:
+            return future.result(timeout=AUTH_TIMEOUT)
+        except FutureTimeout:
+            future.cancel()
+            raise AuthBusy("Sign-in timed out, please try again.")
+        except BrokenProcessPool:
+            ## A worker died (e.g. killed for memory); the next request gets a fresh pool
+            _reset_pool()
+            raise AuthBusy("Sign-in failed on our side, please try again.")
+    finally:
+        latencies.append(time.perf_counter() - start)
+
+
+def _as_bytes(value):
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def hash_password(password, rounds=None):
+    return _run(_hash, _as_bytes(password), rounds or BCRYPT_ROUNDS)
+
+
+def verify_password(password, hashed_password):
+    if not hashed_password:
+        return False
+    return _run(_check, _as_bytes(password), _as_bytes(hashed_password))
+
+
+def hash_rounds(hashed_password):
+    ## "$2b$12$..." -> 12
+    return int(_as_bytes(hashed_password).split(b"$")[2])
+
+
+def needs_rehash(hashed_password, rounds=None):
+    return hash_rounds(hashed_password) != (rounds or BCRYPT_ROUNDS)
+
+
+def latency_percentiles(samples=None):
+    ## {"p50": s, "p99": s} over the recent requests
+    samples = np.asarray(latencies if samples is None else samples)
+    if not samples.size:
+        return {"p50": np.nan, "p99": np.nan}
+    p50, p99 = np.percentile(samples, [50, 99])
+    return {"p50": float(p50), "p99": float(p99)}
+
+
+def load_test(logins=200, concurrency=50, rounds=None):
+    """Fire ``logins`` verifications from ``concurrency`` threads, like a login burst.
+
+    Returns the p50/p99 latency seen by callers plus throughput and how
+    many requests were turned away as busy.
+    """
+    hashed = hash_password("Passw0rd!", rounds)
+    samples, busy = [], 0
+
+    def login(_):
+        start = time.perf_counter()
+        try:
+            verify_password("Passw0rd!", hashed)
+        except AuthBusy:
+            return None
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as callers:
+        for elapsed in callers.map(login, range(logins)):
+            if elapsed is None:
+                busy += 1
+            else:
+                samples.append(elapsed)
+    wall = time.perf_counter() - start
+    return {**latency_percentiles(samples), "logins": logins, "concurrency": concurrency, "busy": busy,
+            "per_second": len(samples) / wall, "workers": AUTH_WORKERS, "rounds": rounds or BCRYPT_ROUNDS}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent-login load test for the bcrypt workers.")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=None)
+    args = parser.parse_args()
+    report = load_test(args.logins, args.concurrency, args.rounds)
+    print("{logins} logins, {concurrency} concurrent, {workers} workers, cost {rounds}: "
+          "p50 {p50:.3f}s  p99 {p99:.3f}s  {per_second:.1f}/s  busy {busy}".format(**report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import argparse
+import gc
+import itertools
+import json
+import os
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from correlation import correlation_heatmap
+from dataset_cache import dataset_key
+from engine import classify_columns, describe, open_dataset
+from ingest import spill_path_for
+from instrumentation import max_rss_bytes
+from missing import missing_bar_chart
+from charts import HISTOGRAM_BINS, category_chart, histogram_chart
+
+BENCH_DIR = os.environ.get("EDA_BENCH_DIR", os.path.join(tempfile.gettempdir(), "eda_bench"))
+RESULTS_PATH = os.environ.get("EDA_BENCH_RESULTS", "benchmark_results.jsonl")
+GENERATE_CHUNK_ROWS = 250_000
+REGRESSION_THRESHOLD = 0.10  ## slower (or bigger) by more than this fraction is flagged
+
+
+def generate_chunks(rows, columns, categorical=0.3, null_rate=0.05, cardinality=20, seed=0,
+                    chunk_rows=GENERATE_CHUNK_ROWS):
+    """Synthetic data, one DataFrame chunk at a time so 100M-row files never sit in memory.
+
+    ``categorical`` is the fraction of string columns (``cardinality`` levels
+    each, Zipf-like frequencies); the rest are continuous. Every cell is NaN
+    with probability ``null_rate``.
+    """
+    rng = np.random.default_rng(seed)
+    n_cat = int(round(columns * categorical))
+    names = ["cat_{}".format(i) for i in range(n_cat)] + ["num_{}".format(i) for i in range(columns - n_cat)]
+    levels = np.array(["level_{}".format(i) for i in range(cardinality)], dtype=object)
+    weights = 1 / np.arange(1, cardinality + 1)
+    weights /= weights.sum()
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        data = {}
+        for i, name in enumerate(names):
+            if i < n_cat:
+                values = levels[rng.choice(cardinality, n, p=weights)]
+                values[rng.random(n) < null_rate] = None
+            else:
+                values = rng.normal(loc=i, scale=1 + i % 7, size=n)
+                values[rng.random(n) < null_rate] = np.nan
+            data[name] = values
+        yield pd.DataFrame(data)
+
+
+def write_dataset(path, rows, columns, categorical=0.3, null_rate=0.05, cardinality=20, seed=0):
+    ## Reuses an existing file with the same parameters (they are in the name)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = "{}.{}.tmp".format(path, os.getpid())
+        with open(tmp_path, "w", encoding="utf-8", newline="") as out:
+            for i, chunk in enumerate(generate_chunks(rows, columns, categorical, null_rate, cardinality, seed)):
+                chunk.to_csv(out, header=i == 0, index=False, float_format="%.6g")
+        os.replace(tmp_path, path)
+    return path
+
+
+def dataset_path(rows, columns, categorical, null_rate, cardinality, seed):
+    return os.path.join(BENCH_DIR, "synthetic_r{}_c{}_cat{:g}_null{:g}_card{}_s{}.csv".format(
+        rows, columns, categorical, null_rate, cardinality, seed))
+
+
+def measure(stage, fn, results, heap=True):
+    """Wall time, CPU time and RSS high-water mark for one stage, then its Python heap peak.
+
+    tracemalloc slows allocation-heavy code down, so the heap peak comes
+    from a second, untimed run of ``fn`` (skipped with ``heap=False``).
+    Returns the value of the timed run.
+    """
+    gc.collect()
+    rss_before = max_rss_bytes()
+    wall, cpu = time.perf_counter(), time.process_time()
+    value = fn()
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    results[stage] = {"seconds": wall, "cpu_seconds": cpu,
+                      "max_rss_bytes": max_rss_bytes(), "rss_growth_bytes": max_rss_bytes() - rss_before}
+    if heap:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            results[stage]["heap_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return value
+
+
+def _figure_stage(stage, build, results, heap=True):
+    ## Figure construction plus the JSON serialization Streamlit does before sending it
+    payload = measure(stage, lambda: build().to_json(), results, heap)
+    results[stage]["payload_bytes"] = len(payload)
+
+
+def _drop_spill(path):
+    ## Cold start: the load stage must parse the CSV, not reuse an earlier run's spill
+    with open(path, "rb") as f:
+        spill_path = spill_path_for(dataset_key(f, reader="ingest_csv"))
+    for spilled in (spill_path, os.path.splitext(spill_path)[0] + ".csv"):
+        if os.path.exists(spilled):
+            os.remove(spilled)
+
+
+def run_stages(path, backend=None, mode="exact", heap=True):
+    results = {}
+
+    def load():
+        _drop_spill(path)
+        return open_dataset(path, backend)
+    data = measure("load", load, results, heap)
+    profiles = measure("profile", lambda: data.profiles(mode), results, heap)
+    cont_columns, cat_columns = measure("classify", lambda: classify_columns(profiles), results, heap)
+    measure("duplicates", data.duplicates, results, heap)
+    measure("describe", lambda: describe(profiles), results, heap)
+    if cont_columns:
+        corr = measure("correlation", lambda: data.correlation(cont_columns), results, heap)
+        _figure_stage("correlation_chart", lambda: correlation_heatmap(corr), results, heap)
+    missing = measure("missing", data.missing_summary, results, heap)
+    _figure_stage("missing_chart", lambda: missing_bar_chart(missing), results, heap)
+    if cont_columns:
+        feature = cont_columns[0]
+        _figure_stage("histogram_chart", lambda: histogram_chart(*data.histogram(feature, HISTOGRAM_BINS)), results, heap)
+    if cat_columns:
+        _figure_stage("category_chart", lambda: category_chart(data.category_counts(cat_columns[0])), results, heap)
+    if len(cont_columns) >= 2:
+        x_axis, y_axis = cont_columns[:2]
+        color = cat_columns[0] if cat_columns else None
+        _figure_stage("scatter_chart", lambda: data.relation_chart("Scatter Plot", x_axis, y_axis, color), results, heap)
+        if cat_columns:
+            _figure_stage("box_chart", lambda: data.relation_chart("Box Plot", cat_columns[0], y_axis), results, heap)
+            _figure_stage("bar_chart", lambda: data.relation_chart("Bar Plot", cat_columns[0], y_axis), results, heap)
+    return results
+
+
+def code_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_results(path=RESULTS_PATH):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def compare(run, history, threshold=REGRESSION_THRESHOLD):
+    """Stage-by-stage ratios against the latest earlier run of the same case on another version.
+
+    Returns (baseline version, {stage: {metric: ratio}}, flagged stages) or None.
+    """
+    earlier = [r for r in history if r["case"] == run["case"] and r["version"] != run["version"]]
+    if not earlier:
+        return None
+    baseline = earlier[-1]
+    ratios, flagged = {}, []
+    for stage, metrics in run["stages"].items():
+        base = baseline["stages"].get(stage)
+        if not base:
+            continue
+        ratios[stage] = {m: metrics[m] / base[m] for m in ("seconds", "heap_peak_bytes", "payload_bytes")
+                         if base.get(m) and m in metrics}
+        if any(ratio > 1 + threshold for ratio in ratios[stage].values()):
+            flagged.append(stage)
+    return baseline["version"], ratios, flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time and memory-profile every dashboard stage on synthetic data.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--columns", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--categorical", type=float, default=0.3, help="fraction of categorical columns")
+    parser.add_argument("--null-rate", type=float, default=0.05)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", choices=("pandas", "duckdb"), default=None)
+    parser.add_argument("--mode", choices=("exact", "approximate"), default="exact")
+    parser.add_argument("--results", default=RESULTS_PATH)
+    parser.add_argument("--no-heap", dest="heap", action="store_false",
+                        help="skip the second, tracemalloc-traced run of each stage (no heap peaks, half the time)")
+    args = parser.parse_args()
+    history = load_results(args.results)
+    version = code_version()
+    for rows, columns in itertools.product(args.rows, args.columns):
+        path = write_dataset(dataset_path(rows, columns, args.categorical, args.null_rate, args.cardinality, args.seed),
+                             rows, columns, args.categorical, args.null_rate, args.cardinality, args.seed)
+        case = {"rows": rows, "columns": columns, "categorical": args.categorical, "null_rate": args.null_rate,
+                "cardinality": args.cardinality, "seed": args.seed, "backend": args.backend or "auto", "mode": args.mode}
+        run = {"version": version, "timestamp": datetime.now(timezone.utc).isoformat(), "case": case,
+               "file_bytes": os.path.getsize(path), "stages": run_stages(path, args.backend, args.mode, args.heap)}
+        with open(args.results, "a", encoding="utf-8") as out:
+            out.write(json.dumps(run) + "\n")
+        print("{rows:,} rows x {columns} columns ({backend}, {mode})".format(**case))
+        for stage, m in run["stages"].items():
+            print("  {:<18} {:>9.3f}s  heap {:>9}  rss {:>9.1f} MB{}".format(
+                stage, m["seconds"], "{:.1f} MB".format(m["heap_peak_bytes"] / 2 ** 20) if "heap_peak_bytes" in m else "-",
+                m["max_rss_bytes"] / 2 ** 20,
+                "  payload {:.1f} KB".format(m["payload_bytes"] / 1024) if "payload_bytes" in m else ""))
+        comparison = compare(run, history)
+        if comparison:
+            baseline, ratios, flagged = comparison
+            print("  vs {}: {}".format(baseline, ", ".join("{} x{:.2f}".format(s, r["seconds"])
+                                                          for s, r in ratios.items() if "seconds" in r)))
+            if flagged:
+                print("  REGRESSION (>{:.0%}): {}".format(REGRESSION_THRESHOLD, ", ".join(flagged)))
+        history.append(run)
+
+
+if __name__ == "__main__":
+    main()
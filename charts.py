@@ -0,0 +1,230 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+SCATTER_GL_MAX_POINTS = int(os.environ.get("EDA_SCATTER_MAX_POINTS", 100_000))
+SCATTER_BINS = 200
+MAX_GROUPS = 50  ## Categories beyond this are folded into OTHER_LABEL
+MAX_COLOR_GROUPS = 10
+OTHER_LABEL = "Other"
+HISTOGRAM_BINS = 50
+TOP_CATEGORIES = 50
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype)
+
+
+def _top_categories(series, limit):
+    ## Keep the most frequent levels, everything else becomes OTHER_LABEL
+    labels = series.astype(object).where(series.notna(), "NaN")
+    top = labels.value_counts().index[:limit]
+    return labels.where(labels.isin(top), OTHER_LABEL)
+
+
+def _discretize(series, bins):
+    ## Returns (codes, centers/labels); codes are -1 for missing values
+    if _is_numeric(series):
+        values = series.to_numpy(dtype="float64", na_value=np.nan)
+        finite = np.isfinite(values)
+        if not finite.any():
+            return np.full(values.size, -1), np.empty(0)
+        edges = np.histogram_bin_edges(values[finite], bins=bins)
+        codes = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, edges.size - 2)
+        codes[~finite] = -1
+        return codes, (edges[:-1] + edges[1:]) / 2
+    codes, labels = pd.factorize(_top_categories(series, bins), sort=True)
+    return codes, np.asarray(labels, dtype=object)
+
+
+def histogram_counts(series, bins=HISTOGRAM_BINS, weights=None):
+    ## Equal-width bin counts over the finite values; returns (counts, edges). Weighted counts are rounded.
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    finite = np.isfinite(values)
+    if weights is None:
+        return np.histogram(values[finite], bins=bins)
+    counts, edges = np.histogram(values[finite], bins=bins, weights=np.asarray(weights)[finite])
+    return np.rint(counts).astype(np.int64), edges
+
+
+def histogram_chart(counts, edges, title=None, x_label=None):
+    fig = go.Figure(go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+                           customdata=np.column_stack((edges[:-1], edges[1:])),
+                           hovertemplate="%{customdata[0]:.4g} - %{customdata[1]:.4g}<br>count: %{y}<extra></extra>"))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title="count", bargap=0)
+    return fig
+
+
+def category_frame(top_counts, levels, rows):
+    ## Chart data for the most frequent levels, the rest of the rows in one OTHER_LABEL bucket
+    labels = ["NaN" if pd.isna(v) else v for v in top_counts.index]
+    values = [int(v) for v in top_counts.tolist()]
+    if levels > len(labels):
+        labels.append("{} ({} levels)".format(OTHER_LABEL, levels - len(labels)))
+        values.append(int(rows - sum(values)))
+    return pd.DataFrame({"Type": labels, "Values": values})
+
+
+def category_counts(series, top_n=TOP_CATEGORIES):
+    counts = series.value_counts(dropna=False)
+    return category_frame(counts.iloc[:top_n], counts.size, series.size)
+
+
+def profile_category_counts(profile, top_n=TOP_CATEGORIES):
+    ## category_counts read off a column profile's top values (sketched in approximate mode); NaN is its own level
+    counts = pd.Series(dict(profile.top_values), dtype="int64")
+    if profile.nulls:
+        counts = pd.concat([counts, pd.Series([profile.nulls], index=[np.nan], dtype="int64")])
+    counts = counts.sort_values(ascending=False, kind="stable")
+    return category_frame(counts.iloc[:top_n], profile.distinct + (profile.nulls > 0), profile.rows)
+
+
+def category_chart(df_cnts, title=None):
+    return px.bar(df_cnts, x="Type", y="Values", title=title, color="Values")
+
+
+def binned_scatter_chart(x_centers, y_centers, counts, x_axis, y_axis, color_encode=None, mean_color=None,
+                         per_color=None, color_labels=None, title=None):
+    """Draw a server-side 2D binning of a scatter plot.
+
+    ``counts`` is the (x bins, y bins) row count grid. Without a color column
+    the figure is a count heatmap; ``mean_color`` (same shape) colors each
+    bin by the mean of a numeric column; ``per_color`` (one row of flattened
+    counts per label in ``color_labels``) draws the dominant category of each
+    occupied bin as a marker.
+    """
+    if not np.asarray(counts).any():
+        empty = [str(axis) for axis, centers in ((x_axis, x_centers), (y_axis, y_centers)) if not len(centers)]
+        raise ValueError("Nothing to plot: {} has no finite values.".format(" and ".join(empty)) if empty else
+                         "Nothing to plot: no row has finite values for both {} and {}.".format(x_axis, y_axis))
+    fig = go.Figure()
+    if per_color is None:
+        z, colorbar = np.where(counts > 0, counts, np.nan), "Rows"
+        if mean_color is not None:
+            z, colorbar = mean_color, "Mean {}".format(color_encode)
+        fig.add_trace(go.Heatmap(x=x_centers, y=y_centers, z=z.T, colorbar={"title": colorbar},
+                                 hoverongaps=False))
+    else:
+        flat = counts.ravel()
+        dominant = per_color.argmax(axis=0)
+        occupied = flat > 0
+        size = 4 + 16 * np.sqrt(flat / max(flat.max(initial=0), 1))
+        x_index, y_index = np.divmod(np.arange(flat.size), len(y_centers))
+        for code, label in enumerate(color_labels):
+            cell = occupied & (dominant == code)
+            fig.add_trace(go.Scattergl(x=np.asarray(x_centers)[x_index[cell]], y=np.asarray(y_centers)[y_index[cell]],
+                                       mode="markers", name=str(label), marker={"size": size[cell]},
+                                       customdata=flat[cell], hovertemplate="Rows: %{customdata}"))
+    fig.update_layout(title=title, xaxis_title=x_axis, yaxis_title=y_axis)
+    return fig
+
+
+def binned_scatter(df, x_axis, y_axis, color_encode=None, bins=SCATTER_BINS, title=None):
+    ## Bin on the server: grid counts plus the per-bin color aggregate
+    x_codes, x_centers = _discretize(df[x_axis], bins)
+    y_codes, y_centers = _discretize(df[y_axis], bins)
+    valid = (x_codes >= 0) & (y_codes >= 0)
+    cells = x_codes[valid] * y_centers.size + y_codes[valid]
+    shape = (x_centers.size, y_centers.size)
+    counts = np.bincount(cells, minlength=x_centers.size * y_centers.size).reshape(shape)
+    mean_color = per_color = color_labels = None
+    if color_encode is not None and _is_numeric(df[color_encode]):
+        color = df[color_encode].to_numpy(dtype="float64", na_value=np.nan)[valid]
+        has_color = ~np.isnan(color)
+        sums = np.bincount(cells[has_color], weights=color[has_color], minlength=counts.size).reshape(shape)
+        n = np.bincount(cells[has_color], minlength=counts.size).reshape(shape)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_color = np.where(n > 0, sums / n, np.nan)
+    elif color_encode is not None:
+        color_codes, color_labels = pd.factorize(_top_categories(df[color_encode], MAX_COLOR_GROUPS)[valid])
+        per_color = np.zeros((color_labels.size, counts.size))
+        np.add.at(per_color, (color_codes, cells), 1)
+    return binned_scatter_chart(x_centers, y_centers, counts, x_axis, y_axis, color_encode, mean_color,
+                                per_color, color_labels, title)
+
+
+def box_stats(df, x_axis, y_axis, color_encode=None):
+    ## Tukey box statistics per group, computed with groupby instead of sending raw points
+    if not _is_numeric(df[y_axis]):
+        raise ValueError("Box plot needs a numeric Y-axis, {} is not numeric.".format(y_axis))
+    keys = [_top_categories(df[x_axis], MAX_GROUPS).rename(x_axis)]
+    if color_encode is not None:
+        keys.append(_top_categories(df[color_encode], MAX_COLOR_GROUPS).rename(color_encode))
+    y = df[y_axis]
+    grouped = y.groupby(keys)
+    stats = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ["q1", "median", "q3"]
+    stats["mean"] = grouped.mean()
+    iqr = stats["q3"] - stats["q1"]
+    lower, upper = stats["q1"] - 1.5 * iqr, stats["q3"] + 1.5 * iqr
+    ## Whiskers end at the most extreme values still inside the fences
+    fences = pd.DataFrame({"low": lower, "high": upper}).reindex(pd.MultiIndex.from_arrays(keys)
+                                                                 if len(keys) > 1 else keys[0]).to_numpy()
+    inside = (y.to_numpy() >= fences[:, 0]) & (y.to_numpy() <= fences[:, 1])
+    stats["lowerfence"] = y[inside].groupby([k[inside] for k in keys]).min()
+    stats["upperfence"] = y[inside].groupby([k[inside] for k in keys]).max()
+    return stats.reset_index()
+
+
+def box_chart(stats, x_axis, y_axis, color_encode=None, title=None):
+    ## stats: one row per group with q1/median/q3/mean/lowerfence/upperfence (see box_stats)
+    fig = go.Figure()
+    groups = stats.groupby(color_encode, sort=False) if color_encode is not None else [(None, stats)]
+    for label, group in groups:
+        fig.add_trace(go.Box(x=group[x_axis], q1=group["q1"], median=group["median"], q3=group["q3"],
+                             mean=group["mean"], lowerfence=group["lowerfence"], upperfence=group["upperfence"],
+                             name=str(label) if label is not None else y_axis, showlegend=label is not None))
+    fig.update_layout(title=title, xaxis_title=x_axis, yaxis_title=y_axis, boxmode="group")
+    return fig
+
+
+def bar_value_name(x_axis, y_axis, color_encode, numeric):
+    if not numeric:
+        return "Count of {}".format(y_axis)
+    return y_axis if y_axis not in (x_axis, color_encode) else "Sum of {}".format(y_axis)
+
+
+def bar_stats(df, x_axis, y_axis, color_encode=None, weights=None):
+    """One row per (x, color) group: the sum of y, or the row count when y is not numeric.
+
+    With ``weights`` (population rows per sampled row) both are weighted,
+    i.e. estimates of the population sums and counts.
+    """
+    keys = [_top_categories(df[x_axis], MAX_GROUPS).rename(x_axis)]
+    if color_encode is not None:
+        keys.append(_top_categories(df[color_encode], MAX_COLOR_GROUPS).rename(color_encode))
+    numeric = _is_numeric(df[y_axis])
+    value = bar_value_name(x_axis, y_axis, color_encode, numeric)
+    if weights is not None:
+        weights = pd.Series(weights, index=df.index)
+        values = df[y_axis] * weights if numeric else weights
+        return values.groupby(keys).sum().rename(value).reset_index()
+    grouped = df[y_axis].groupby(keys)
+    return (grouped.sum() if numeric else grouped.size()).rename(value).reset_index()
+
+
+def bar_chart(stats, x_axis, value, color_encode=None, title=None):
+    return px.bar(stats, x=x_axis, y=value, color=color_encode, barmode="group", title=title)
+
+
+def build_relation_chart(df, chart_type, x_axis, y_axis, color_encode=None, title=None, weights=None):
+    """Tab 3 figure whose payload does not grow with the row count.
+
+    Scatter plots below ``SCATTER_GL_MAX_POINTS`` rows are drawn as WebGL
+    points, larger ones are binned on the server. Box and bar plots are
+    always built from per-group aggregates. ``weights`` (for a sample)
+    turn bar heights into population estimates.
+    """
+    if color_encode == x_axis:
+        color_encode = None
+    if chart_type == "Box Plot":
+        return box_chart(box_stats(df, x_axis, y_axis, color_encode), x_axis, y_axis, color_encode, title)
+    if chart_type == "Bar Plot":
+        stats = bar_stats(df, x_axis, y_axis, color_encode, weights)
+        return bar_chart(stats, x_axis, stats.columns[-1], color_encode, title)
+    if len(df) <= SCATTER_GL_MAX_POINTS:
+        return px.scatter(df, x=x_axis, y=y_axis, color=color_encode, render_mode="webgl", title=title)
+    return binned_scatter(df, x_axis, y_axis, color_encode, title=title)
@@ -0,0 +1,191 @@
+import dataclasses
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+PINNED_ARTIFACTS = ("backend", "df")  ## The parsed dataset itself; evicted only with the whole dataset
+HASH_BLOCK_SIZE = 8 * 1024 * 1024
+
+
+def dataset_key(upload, **parse_options):
+    ## Key = hash of the uploaded bytes + the options used to parse them
+    digest = hashlib.blake2b(digest_size=16)
+    if hasattr(upload, "getbuffer") or not hasattr(upload, "read"):
+        buffer = upload.getbuffer() if hasattr(upload, "getbuffer") else memoryview(upload)
+        for start in range(0, len(buffer), HASH_BLOCK_SIZE):
+            digest.update(buffer[start:start + HASH_BLOCK_SIZE])
+    else:  ## file on disk: stream it
+        upload.seek(0)
+        for block in iter(lambda: upload.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    options = ",".join("{}={!r}".format(k, parse_options[k]) for k in sorted(parse_options))
+    return "{}:{}".format(digest.hexdigest(), options)
+
+
+def estimate_nbytes(obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        usage = obj.memory_usage(deep=True, index=True)
+        return int(usage.sum()) if isinstance(obj, pd.DataFrame) else int(usage)
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, (list, tuple, set)):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(o) for o in obj)
+    if isinstance(obj, dict):
+        return sys.getsizeof(obj) + sum(estimate_nbytes(k) + estimate_nbytes(v) for k, v in obj.items())
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):  ## samples, profiles, missing summaries
+        return sys.getsizeof(obj) + sum(estimate_nbytes(getattr(obj, f.name)) for f in dataclasses.fields(obj))
+    if hasattr(obj, "to_plotly_json"):  ## plotly figure
+        return sum(estimate_nbytes(getattr(t, "x", None)) + estimate_nbytes(getattr(t, "y", None)) for t in obj.data) + 64 * 1024
+    if hasattr(obj, "canvas"):  ## matplotlib figure
+        width, height = obj.get_size_inches() * obj.dpi
+        return int(width * height * 4)
+    if hasattr(obj, "nbytes"):  ## query backends report what they hold in memory
+        return int(obj.nbytes)
+    return sys.getsizeof(obj)
+
+
+class DatasetCache:
+    """Process-wide LRU of parsed datasets and everything derived from them.
+
+    Size is bounded in (estimated) bytes. Derived artifacts are evicted one
+    at a time, least recently used first, from any dataset; a dataset's
+    parsed frame or backend (``PINNED_ARTIFACTS``) goes only once nothing
+    derived is left to evict, together with the whole dataset, and never
+    for the dataset being written to. That dataset's frame or backend is not
+    counted against ``max_bytes``, so a frame larger than the budget still
+    keeps up to ``max_bytes`` of derived artifacts around it.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._datasets = OrderedDict()  ## key -> {artifact name: value}
+        self._sizes = {}  ## key -> {artifact name: estimated bytes}
+        self._order = OrderedDict()  ## (key, name) of derived artifacts, least recently used first
+        self._lock = threading.RLock()
+        self._key_locks = {}
+        self._pending = {}  ## (key, name) -> Future of a background get()
+        self.hits = 0
+        self.misses = 0
+
+    def _key_lock(self, key, name):
+        with self._lock:
+            return self._key_locks.setdefault((key, name), threading.Lock())
+
+    def get(self, key, name, compute):
+        with self._lock:
+            artifacts = self._datasets.get(key)
+            if artifacts is not None and name in artifacts:
+                self._touch(key, name)
+                self.hits += 1
+                return artifacts[name]
+        ## One session computes an artifact, concurrent sessions wait for it
+        lock = self._key_lock(key, name)
+        try:
+            with lock:
+                with self._lock:
+                    artifacts = self._datasets.get(key)
+                    if artifacts is not None and name in artifacts:
+                        self._touch(key, name)
+                        self.hits += 1
+                        return artifacts[name]
+                self.misses += 1
+                value = compute()
+                self.put(key, name, value)
+                return value
+        finally:
+            ## Waiters already hold the lock object; later callers find the value cached
+            with self._lock:
+                if self._key_locks.get((key, name)) is lock:
+                    del self._key_locks[(key, name)]
+
+    def peek(self, key, name, default=None):
+        ## Cached value or ``default``; never computes, and leaves LRU order and hit counts alone
+        with self._lock:
+            return self._datasets.get(key, {}).get(name, default)
+
+    def submit(self, key, name, compute, executor):
+        """Compute an artifact on ``executor``; the Future resolves once it is cached.
+
+        A second submit while the first is running returns the same Future.
+        A failed Future stays registered so its error can be shown; the next
+        submit replaces it.
+        """
+        with self._lock:
+            future = self._pending.get((key, name))
+            if future is None or future.done():
+                future = executor.submit(self.get, key, name, compute)
+                self._pending[(key, name)] = future
+                future.add_done_callback(lambda f: self._finished(key, name, f))
+            return future
+
+    def _finished(self, key, name, future):
+        with self._lock:
+            if future.exception() is None and self._pending.get((key, name)) is future:
+                del self._pending[(key, name)]
+
+    def pending(self, key, name):
+        ## The Future of a background computation, or None
+        with self._lock:
+            return self._pending.get((key, name))
+
+    def _touch(self, key, name):
+        self._datasets.move_to_end(key)
+        if name not in PINNED_ARTIFACTS:
+            self._order[(key, name)] = None
+            self._order.move_to_end((key, name))
+
+    def put(self, key, name, value):
+        size = estimate_nbytes(value)
+        with self._lock:
+            self._datasets.setdefault(key, {})[name] = value
+            self._sizes.setdefault(key, {})[name] = size
+            self._touch(key, name)
+            self._evict(keep=(key, name))
+
+    def _evict(self, keep):
+        ## ``keep`` is the (key, name) just written: it stays, and so does its dataset. That dataset's
+        ## own frame/backend is not charged to the budget, or one bigger than max_bytes would push
+        ## out every derived artifact on every put
+        while self.nbytes - self._pinned_nbytes(keep[0]) > self.max_bytes:
+            victim = next((k for k in self._order if k != keep), None)
+            if victim is not None:
+                self._discard(*victim)
+                continue
+            oldest = next((k for k in self._datasets if k != keep[0]), None)
+            if oldest is None:
+                break
+            self.drop(oldest)
+
+    def _pinned_nbytes(self, key):
+        sizes = self._sizes.get(key, {})
+        return sum(sizes.get(name, 0) for name in PINNED_ARTIFACTS)
+
+    def _discard(self, key, name):
+        self._datasets[key].pop(name, None)
+        self._sizes[key].pop(name, None)
+        self._order.pop((key, name), None)
+
+    def drop(self, key):
+        with self._lock:
+            self._datasets.pop(key, None)
+            self._sizes.pop(key, None)
+            for order_key in [k for k in self._order if k[0] == key]:
+                del self._order[order_key]
+            for lock_key in [k for k in self._key_locks if k[0] == key]:
+                del self._key_locks[lock_key]
+            for pending_key in [k for k in self._pending if k[0] == key]:
+                del self._pending[pending_key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._datasets
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            return sum(sum(sizes.values()) for sizes in self._sizes.values())
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+CHUNK_ROWS = 1_000_000
+VERIFY_ROWS = 65_536  ## Candidate rows compared per fetch_rows() call
+
+
+def row_hashes(chunk):
+    ## One 64-bit hash per row, combined across columns; the index is ignored like drop_duplicates()
+    return pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+
+def _rows_equal(left, right):
+    equal = np.ones(len(left), dtype=bool)
+    for col in left.columns:
+        a, b = left[col].to_numpy(), right[col].to_numpy()
+        equal &= (a == b) | (pd.isna(a) & pd.isna(b))
+    return equal
+
+
+class DuplicateCounter:
+    """Counts duplicate rows from row hashes, one chunk at a time.
+
+    Only 8 bytes per row are kept. Rows whose hash was already seen are
+    candidates; ``duplicated(fetch_rows)`` re-reads those rows and the first
+    row of their hash group, ``VERIFY_ROWS`` at a time, to rule out hash
+    collisions.
+    """
+
+    def __init__(self):
+        self._hashes = []
+        self.rows = 0
+
+    def update(self, chunk):
+        self._hashes.append(row_hashes(chunk))
+        self.rows += len(chunk)
+        return self
+
+    def duplicated(self, fetch_rows=None):
+        ## Boolean mask like DataFrame.duplicated(keep="first")
+        hashes = np.concatenate(self._hashes) if self._hashes else np.empty(0, dtype=np.uint64)
+        by_hash = pd.Series(hashes)
+        mask = by_hash.duplicated(keep="first").to_numpy(copy=True)  ## written to below; read-only under copy-on-write
+        if fetch_rows is None or not mask.any():
+            return mask
+        repeats = np.flatnonzero(mask)
+        first_of_group = by_hash.drop_duplicates(keep="first")
+        firsts = pd.Series(first_of_group.index, index=first_of_group.to_numpy())[hashes[repeats]].to_numpy()
+        ## Candidates are checked VERIFY_ROWS at a time, so at most 2 * VERIFY_ROWS rows are held at once
+        unequal = []
+        for start in range(0, repeats.size, VERIFY_ROWS):
+            batch = slice(start, start + VERIFY_ROWS)
+            equal = _rows_equal(fetch_rows(repeats[batch]).reset_index(drop=True),
+                                fetch_rows(firsts[batch]).reset_index(drop=True))
+            unequal.append(repeats[batch][~equal])
+        ## A real collision: settle each affected hash group row by row
+        for value in np.unique(hashes[np.concatenate(unequal)]):
+            positions = np.flatnonzero(hashes == value)
+            mask[positions] = fetch_rows(positions).duplicated(keep="first").to_numpy()
+        return mask
+
+    def count(self, fetch_rows=None):
+        return int(self.duplicated(fetch_rows).sum())
+
+
+def duplicate_mask(df, chunk_rows=CHUNK_ROWS):
+    counter = DuplicateCounter()
+    for start in range(0, len(df), chunk_rows):
+        counter.update(df.iloc[start:start + chunk_rows])
+    return counter.duplicated(lambda positions: df.iloc[positions])
+
+
+def count_duplicates(df, chunk_rows=CHUNK_ROWS):
+    ## Same number as df.shape[0] - df.drop_duplicates().shape[0], without the deduplicated copy
+    return int(duplicate_mask(df, chunk_rows).sum())
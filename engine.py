@@ -0,0 +1,193 @@
+import argparse
+import html
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+from backends import DuckDBBackend, PandasBackend, choose_backend
+from charts import TOP_CATEGORIES
+from correlation import correlation_heatmap, top_correlated_pairs
+from dataset_cache import dataset_key
+from ingest import ingest_csv, spill_path_for, spill_upload
+from missing import missing_bar_chart, missing_pattern_chart
+from profiling import PROFILE_MODES
+
+BATCH_WORKERS = int(os.environ.get("EDA_BATCH_WORKERS", os.cpu_count() or 1))
+
+
+def classify_columns(profiles):
+    ## (continuous, categorical) column names, as the dashboard splits them
+    cont_columns, cat_columns = [], []
+    for col, profile in profiles.items():
+        if profile.is_categorical:
+            cat_columns.append(col.strip())
+        else:
+            cont_columns.append(col.strip())
+    return cont_columns, cat_columns
+
+
+def open_dataset(path, backend=None):
+    ## Query backend over a CSV on disk, through the same Parquet spill the dashboard uses
+    with open(path, "rb") as f:
+        spill_path = spill_path_for(dataset_key(f, reader="ingest_csv"))
+        if (backend or choose_backend(os.path.getsize(path))) == "duckdb":
+            return DuckDBBackend(spill_upload(f, spill_path))
+        return PandasBackend(ingest_csv(f, spill_path), source_path=spill_path)
+
+
+def overview(backend, profiles):
+    cont_columns, cat_columns = classify_columns(profiles)
+    return {"rows": backend.row_count(), "features": len(backend.columns), "duplicates": backend.duplicates()[0],
+            "categorical_columns": cat_columns, "continuous_columns": cont_columns}
+
+
+def describe(profiles):
+    ## df.describe() for the numeric columns, read off the profiles
+    rows = {}
+    for col, p in profiles.items():
+        if p.is_numeric:
+            rows[col] = {"count": p.count, "mean": p.mean, "std": p.std, "min": p.min,
+                         **{"{:g}%".format(100 * q): v for q, v in p.quantiles.items()}, "max": p.max}
+    return pd.DataFrame(rows)
+
+
+@dataclass
+class Report:
+    name: str
+    mode: str
+    overview: dict
+    describe: pd.DataFrame
+    profiles: dict  ## {column: ColumnProfile}
+    correlation: pd.DataFrame
+    missing: object  ## MissingSummary
+    value_counts: dict  ## {categorical column: DataFrame of Type/Values}
+    seconds: float
+
+    def to_dict(self):
+        return _jsonable({
+            "name": self.name, "mode": self.mode, "seconds": self.seconds, "overview": self.overview,
+            "describe": self.describe.to_dict(),
+            "profiles": {col: asdict(p) for col, p in self.profiles.items()},
+            "correlation": self.correlation.to_dict(),
+            "correlated_pairs": top_correlated_pairs(self.correlation).to_dict(orient="records"),
+            "missing": {"rows": self.missing.rows, "complete_rows": self.missing.complete_rows,
+                        "null_counts": self.missing.null_counts.to_dict(),
+                        "patterns": self.missing.patterns.to_dict(orient="records"),
+                        "pattern_rows": self.missing.pattern_rows.tolist(),
+                        "pattern_error": self.missing.pattern_error},
+            "value_counts": {col: counts.to_dict(orient="records") for col, counts in self.value_counts.items()},
+        })
+
+    def to_html(self):
+        ## One self-contained page: tables plus the dashboard's interactive figures (plotly.js from CDN)
+        ov = self.overview
+        parts = ["<h1>{}</h1>".format(html.escape(self.name)),
+                 "<p><b>Rows</b> : {} &nbsp; <b>Features</b> : {} &nbsp; <b>Duplicates</b> : {} &nbsp; "
+                 "<b>Profile</b> : {} ({:.1f} s)</p>".format(ov["rows"], ov["features"], ov["duplicates"], self.mode,
+                                                            self.seconds),
+                 "<p><b>Categorical Columns</b> : {}</p>".format(html.escape(", ".join(ov["categorical_columns"]))),
+                 "<p><b>Continuous Columns</b> : {}</p>".format(html.escape(", ".join(ov["continuous_columns"]))),
+                 "<h2>Summary Statistics</h2>", self.describe.to_html(float_format="{:.4g}".format)]
+        figures = [missing_bar_chart(self.missing, "Non-null Values"), missing_pattern_chart(self.missing, "Missing-Value Patterns")]
+        if not self.correlation.empty:
+            figures.insert(0, correlation_heatmap(self.correlation, title="Correlation"))
+            parts += ["<h2>Most Correlated Pairs</h2>", top_correlated_pairs(self.correlation).to_html(index=False)]
+        parts += [fig.to_html(full_html=False, include_plotlyjs="cdn" if i == 0 else False)
+                  for i, fig in enumerate(figures)]
+        for col, counts in self.value_counts.items():
+            parts += ["<h3>{}</h3>".format(html.escape(str(col))), counts.to_html(index=False)]
+        return "<!DOCTYPE html><html><head><meta charset='utf-8'><title>{}</title></head><body>{}</body></html>".format(
+            html.escape(self.name), "\n".join(parts))
+
+
+def _jsonable(value):
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return None if pd.isna(value) else str(value)
+
+
+def profile_dataset(backend, mode="exact", name="dataset", top_n=TOP_CATEGORIES):
+    """Everything the dashboard shows for a dataset, without Streamlit."""
+    start = time.perf_counter()
+    profiles = backend.profiles(mode)
+    cont_columns, cat_columns = classify_columns(profiles)
+    columns = {col.strip(): col for col in profiles}
+    return Report(name=name, mode=mode, overview=overview(backend, profiles), describe=describe(profiles),
+                  profiles=profiles,
+                  correlation=backend.correlation([columns[c] for c in cont_columns]) if cont_columns else pd.DataFrame(),
+                  missing=backend.missing_summary(),
+                  value_counts={col: backend.category_counts(columns[col], top_n) for col in cat_columns},
+                  seconds=time.perf_counter() - start)
+
+
+def profile_file(path, out_dir, formats=("json", "html"), mode="exact", backend=None):
+    ## Runs in a batch worker; returns the written report paths
+    name = os.path.splitext(os.path.basename(path))[0]
+    report = profile_dataset(open_dataset(path, backend), mode, name=os.path.basename(path))
+    written = []
+    for fmt in formats:
+        out_path = os.path.join(out_dir, "{}.{}".format(name, fmt))
+        with open(out_path, "w", encoding="utf-8") as out:
+            if fmt == "json":
+                json.dump(report.to_dict(), out, indent=1)
+            else:
+                out.write(report.to_html())
+        written.append(out_path)
+    return written
+
+
+def profile_directory(in_dir, out_dir, formats=("json", "html"), mode="exact", backend=None, workers=BATCH_WORKERS):
+    """Profile every CSV in ``in_dir`` across ``workers`` processes.
+
+    Yields (csv path, report paths or None, error or None) as files finish;
+    one bad file does not stop the batch.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    paths = sorted(os.path.join(in_dir, f) for f in os.listdir(in_dir) if f.lower().endswith(".csv"))
+    ## Biggest files first so a large one does not start last and stretch the batch
+    paths.sort(key=os.path.getsize, reverse=True)
+    with ProcessPoolExecutor(max(1, workers), mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(profile_file, path, out_dir, formats, mode, backend): path for path in paths}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result(), None
+            except Exception as e:
+                yield futures[future], None, e
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile a directory of CSV files into JSON/HTML reports.")
+    parser.add_argument("in_dir")
+    parser.add_argument("out_dir")
+    parser.add_argument("--format", dest="formats", nargs="+", choices=("json", "html"), default=["json", "html"])
+    parser.add_argument("--mode", choices=PROFILE_MODES, default="exact")
+    parser.add_argument("--backend", choices=("pandas", "duckdb"), default=None)
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    args = parser.parse_args()
+    failed = 0
+    for path, written, error in profile_directory(args.in_dir, args.out_dir, args.formats, args.mode, args.backend,
+                                                  args.workers):
+        if error is None:
+            print("{} -> {}".format(path, ", ".join(written)))
+        else:
+            failed += 1
+            print("{} failed: {!r}".format(path, error))
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
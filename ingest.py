@@ -0,0 +1,266 @@
+import codecs
+import csv
+import hashlib
+import io
+import os
+import tempfile
+import threading
+from collections import Counter
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  ## pandas-only fallback, no Parquet spill
+    pa = None
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_BYTES = 16 * 1024 * 1024
+PANDAS_CHUNK_ROWS = 200_000
+SPILL_DIR = os.environ.get("EDA_SPILL_DIR", os.path.join(tempfile.gettempdir(), "eda_spill"))
+SPILL_MAX_BYTES = int(os.environ.get("EDA_SPILL_MAX_BYTES", 20 * 1024 ** 3))
+NULL_VALUES = ["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+               "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"]  ## Same defaults as pd.read_csv
+
+
+class _CountingReader(io.RawIOBase):
+    ## Wraps the upload buffer so we know how far the parser has got
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.raw.seek(offset, whence)
+
+    def tell(self):
+        return self.raw.tell()
+
+    def read(self, size=-1):
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def sniff_csv(prefix):
+    ## Guess encoding and dialect from the first few KB instead of parsing the whole file twice
+    try:
+        text = codecs.getincrementaldecoder("utf-8")().decode(prefix, final=False)
+        encoding = "utf-8"
+    except UnicodeDecodeError:
+        text = prefix.decode("latin1")
+        encoding = "latin1"
+    sample = text[:text.rfind("\n") + 1] or text
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        delimiter, quotechar = dialect.delimiter, dialect.quotechar or '"'
+    except csv.Error:
+        delimiter, quotechar = ",", '"'
+    return encoding, delimiter, quotechar
+
+
+def spill_path_for(key):
+    return os.path.join(SPILL_DIR, hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest() + ".parquet")
+
+
+def read_spill(path):
+    ## Batch by batch, so only one batch's Arrow copy is alive next to the DataFrame pieces
+    spill = pq.ParquetFile(path, memory_map=True)
+    frames = [batch.to_pandas() for batch in spill.iter_batches()]
+    if not frames:
+        return spill.schema_arrow.empty_table().to_pandas()
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    del frames
+    pa.default_memory_pool().release_unused()  ## hand the batches' buffers back to the OS
+    return df
+
+
+_held_spills = Counter()  ## spill path -> live readers holding it
+_held_spills_lock = threading.Lock()
+
+
+def hold_spill(path):
+    ## For readers that go back to the file on every query (DuckDB views): prune_spill_dir leaves it alone
+    with _held_spills_lock:
+        _held_spills[os.path.abspath(path)] += 1
+
+
+def release_spill(path):
+    with _held_spills_lock:
+        path = os.path.abspath(path)
+        _held_spills[path] -= 1
+        if _held_spills[path] <= 0:
+            del _held_spills[path]
+
+
+def prune_spill_dir(max_bytes=SPILL_MAX_BYTES):
+    ## Oldest first; held spills still count towards max_bytes but are never removed
+    if not os.path.isdir(SPILL_DIR):
+        return
+    files = [os.path.join(SPILL_DIR, f) for f in os.listdir(SPILL_DIR) if f.endswith((".parquet", ".csv"))]
+    files.sort(key=os.path.getmtime, reverse=True)
+    with _held_spills_lock:
+        held = set(_held_spills)
+    total = 0
+    for path in files:
+        total += os.path.getsize(path)
+        if total > max_bytes and os.path.abspath(path) not in held:
+            os.remove(path)
+
+
+def _upload_size(upload):
+    position = upload.tell()
+    size = upload.seek(0, io.SEEK_END)
+    upload.seek(position)
+    return size
+
+
+def _open_arrow_reader(source, encoding, delimiter, quotechar, column_types=None):
+    return pa_csv.open_csv(
+        source,
+        read_options=pa_csv.ReadOptions(encoding="utf8" if encoding == "utf-8" else encoding, block_size=CHUNK_BYTES),
+        parse_options=pa_csv.ParseOptions(delimiter=delimiter, quote_char=quotechar),
+        convert_options=pa_csv.ConvertOptions(column_types=column_types, null_values=NULL_VALUES,
+                                              strings_can_be_null=True),
+    )
+
+
+def _ingest_arrow(upload, spill_path, encoding, delimiter, quotechar, progress, sampler=None):
+    size = _upload_size(upload) or 1
+    counter = _CountingReader(upload)
+
+    def reopen(encoding, column_types=None):
+        upload.seek(0)
+        counter.bytes_read = 0
+        return _open_arrow_reader(pa.PythonFile(counter, mode="r"), encoding, delimiter, quotechar, column_types)
+
+    reader = reopen(encoding)
+    ## Invalid UTF-8 past the sniffed prefix but inside the first block is inferred as binary, not raised
+    if encoding == "utf-8" and any(pa.types.is_binary(f.type) for f in reader.schema):
+        encoding = "latin1"
+        reader = reopen(encoding)
+    ## Types are inferred on the first block and locked for the rest of the stream.
+    ## Dates stay as text, like pd.read_csv without parse_dates.
+    temporal = {f.name: pa.string() for f in reader.schema if pa.types.is_temporal(f.type)}
+    if temporal:
+        reader = reopen(encoding, temporal)
+    os.makedirs(os.path.dirname(spill_path), exist_ok=True)
+    tmp_path = "{}.{}.tmp".format(spill_path, os.getpid())
+    try:
+        with pq.ParquetWriter(tmp_path, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+                if sampler is not None:
+                    sampler.update(batch.to_pandas())
+                if progress:
+                    progress(min(counter.bytes_read / size, 1.0))
+        os.replace(tmp_path, spill_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _ingest_pandas(upload, encoding, delimiter, quotechar, progress, sampler=None):
+    size = _upload_size(upload) or 1
+    upload.seek(0)
+    chunks = []
+    for chunk in pd.read_csv(upload, encoding=encoding, sep=delimiter, quotechar=quotechar,
+                             chunksize=PANDAS_CHUNK_ROWS):
+        chunks.append(chunk)
+        if sampler is not None:
+            sampler.update(chunk)
+        if progress:
+            progress(min(upload.tell() / size, 1.0))
+    return pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+
+
+def _copy_as_utf8(upload, path, encoding):
+    ## Plain CSV spill for when there is no pyarrow: DuckDB reads UTF-8 only
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    upload.seek(0)
+    try:
+        with open(tmp_path, "wb") as out:
+            decoder = codecs.getincrementaldecoder(encoding)()
+            for block in iter(lambda: upload.read(CHUNK_BYTES), b""):
+                out.write(decoder.decode(block).encode("utf-8"))
+            out.write(decoder.decode(b"", final=True).encode("utf-8"))
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _spill_parquet(upload, spill_path, progress, sampler=None):
+    if pa is None:
+        return False
+    if os.path.exists(spill_path):
+        os.utime(spill_path)
+        return True
+    upload.seek(0)
+    encoding, delimiter, quotechar = sniff_csv(upload.read(SNIFF_BYTES))
+    try:
+        _ingest_arrow(upload, spill_path, encoding, delimiter, quotechar, progress, sampler)
+    except (pa.ArrowInvalid, UnicodeDecodeError):
+        ## A later block did not fit the locked types (or the prefix lied about the encoding)
+        return False
+    finally:
+        pa.default_memory_pool().release_unused()  ## the parser's blocks, before anything reads the spill back
+    prune_spill_dir()
+    return True
+
+
+def spill_upload(upload, spill_path, progress=None, sampler=None):
+    """Put the upload on local disk for out-of-core readers and return the file path.
+
+    That is the Parquet spill when pyarrow can parse the file, otherwise a
+    UTF-8 copy of the CSV next to it.
+    """
+    if _spill_parquet(upload, spill_path, progress, sampler):
+        return spill_path
+    if sampler is not None:
+        sampler.reset()
+    csv_path = os.path.splitext(spill_path)[0] + ".csv"
+    if not os.path.exists(csv_path):
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        upload.seek(0)
+        encoding = sniff_csv(upload.read(SNIFF_BYTES))[0]
+        try:
+            _copy_as_utf8(upload, csv_path, encoding)
+        except UnicodeDecodeError:
+            _copy_as_utf8(upload, csv_path, "latin1")
+    return csv_path
+
+
+def ingest_csv(upload, spill_path=None, progress=None, sampler=None):
+    """Parse an uploaded CSV into a DataFrame.
+
+    With pyarrow available the file is streamed block by block into a Parquet
+    copy at ``spill_path`` and read back memory-mapped; a later call with the
+    same path skips parsing entirely. ``progress`` receives a 0-1 fraction.
+    ``sampler`` (see sampling.Reservoir) sees every parsed chunk; it is reset
+    whenever parsing restarts, and not fed at all when the spill is reused.
+    """
+    if spill_path and _spill_parquet(upload, spill_path, progress, sampler):
+        return read_spill(spill_path)
+    upload.seek(0)
+    encoding, delimiter, quotechar = sniff_csv(upload.read(SNIFF_BYTES))
+    try:
+        if sampler is not None:
+            sampler.reset()
+        return _ingest_pandas(upload, encoding, delimiter, quotechar, progress, sampler)
+    except UnicodeDecodeError:
+        if sampler is not None:
+            sampler.reset()
+        return _ingest_pandas(upload, "latin1", delimiter, quotechar, progress, sampler)
@@ -0,0 +1,183 @@
+import functools
+import json
+import logging
+import os
+import platform
+import resource
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RECENT_STAGES = 1000
+METRICS_PORT = int(os.environ.get("EDA_METRICS_PORT", 0))  ## Prometheus text on http://127.0.0.1:PORT/metrics; 0 = off
+ADMIN_EMAILS = {e.strip() for e in os.environ.get("EDA_ADMIN_EMAILS", "").split(",") if e.strip()}
+
+if os.environ.get("EDA_TRACEMALLOC") == "1":  ## heap deltas per stage, at some allocation overhead
+    tracemalloc.start()
+
+logger = logging.getLogger("eda.stages")
+if os.environ.get("EDA_STAGE_LOG") == "1":
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+
+
+@dataclass
+class StageRecord:
+    stage: str
+    started: float  ## unix time
+    seconds: float = 0.0
+    cpu_seconds: float = 0.0  ## this thread's CPU time; work handed to pools is not included
+    max_rss_bytes: int = 0  ## process high-water mark after the stage
+    heap_delta_bytes: int = None  ## tracemalloc, process-wide; None unless EDA_TRACEMALLOC=1
+    rows: int = None
+    columns: int = None
+    cache: str = None  ## "hit", "miss" or None when the stage is not cached
+    error: str = None
+
+
+def max_rss_bytes():
+    ## ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class StageMetrics:
+    """Process-wide stage totals for the metrics endpoint, plus the most recent records."""
+
+    def __init__(self, recent=RECENT_STAGES):
+        self.recent = deque(maxlen=recent)
+        self._totals = {}  ## stage -> {"calls", "seconds", "cpu_seconds", "max_seconds", "hits", "misses", "errors"}
+        self._gauges = {"eda_process_max_rss_bytes": ("Peak resident set size of the server process", max_rss_bytes)}
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.recent.append(record)
+            totals = self._totals.setdefault(record.stage, dict.fromkeys(
+                ("calls", "seconds", "cpu_seconds", "max_seconds", "hits", "misses", "errors"), 0))
+            totals["calls"] += 1
+            totals["seconds"] += record.seconds
+            totals["cpu_seconds"] += record.cpu_seconds
+            totals["max_seconds"] = max(totals["max_seconds"], record.seconds)
+            totals["hits"] += record.cache == "hit"
+            totals["misses"] += record.cache == "miss"
+            totals["errors"] += record.error is not None
+
+    def register_gauge(self, name, help_text, fn):
+        self._gauges[name] = (help_text, fn)
+
+    def totals(self):
+        with self._lock:
+            return {stage: dict(t) for stage, t in self._totals.items()}
+
+    def prometheus_text(self):
+        ## Prometheus text exposition format 0.0.4
+        counters = (("calls", "eda_stage_calls_total", "Stage executions"),
+                    ("seconds", "eda_stage_seconds_total", "Wall time spent in the stage"),
+                    ("cpu_seconds", "eda_stage_cpu_seconds_total", "CPU time spent in the stage"),
+                    ("hits", "eda_stage_cache_hits_total", "Stage results served from the dataset cache"),
+                    ("misses", "eda_stage_cache_misses_total", "Stage results computed on a cache miss"),
+                    ("errors", "eda_stage_errors_total", "Stage executions that raised"))
+        totals = self.totals()
+        lines = []
+        for field, metric, help_text in counters:
+            lines += ["# HELP {} {}".format(metric, help_text), "# TYPE {} counter".format(metric)]
+            lines += ['{}{{stage="{}"}} {}'.format(metric, _label(stage), t[field]) for stage, t in sorted(totals.items())]
+        lines += ["# HELP eda_stage_max_seconds Slowest execution of the stage", "# TYPE eda_stage_max_seconds gauge"]
+        lines += ['eda_stage_max_seconds{{stage="{}"}} {}'.format(_label(stage), t["max_seconds"])
+                  for stage, t in sorted(totals.items())]
+        for name, (help_text, fn) in list(self._gauges.items()):
+            lines += ["# HELP {} {}".format(name, help_text), "# TYPE {} gauge".format(name), "{} {}".format(name, fn())]
+        return "\n".join(lines) + "\n"
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = StageMetrics()
+_run = threading.local()  ## records of the current script run, per Streamlit script thread
+
+
+def begin_run():
+    _run.records = []
+
+
+def run_records():
+    return list(getattr(_run, "records", []))
+
+
+@contextmanager
+def stage(name, rows=None, columns=None):
+    """Time a block as stage ``name``; the yielded record can be annotated (e.g. ``record.cache``)."""
+    record = StageRecord(stage=name, started=time.time(), rows=rows, columns=columns)
+    heap = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield record
+    except Exception as e:
+        record.error = type(e).__name__
+        raise
+    finally:
+        record.seconds = time.perf_counter() - wall
+        record.cpu_seconds = time.thread_time() - cpu
+        record.max_rss_bytes = max_rss_bytes()
+        if heap is not None and tracemalloc.is_tracing():
+            record.heap_delta_bytes = tracemalloc.get_traced_memory()[0] - heap
+        metrics.add(record)
+        if hasattr(_run, "records"):
+            _run.records.append(record)
+        logger.info(json.dumps(asdict(record)))
+
+
+def cached(cache, key, name, compute, stage_name=None, rows=None, columns=None):
+    ## DatasetCache.get as a stage, recording whether it was a hit
+    with stage(stage_name or (name if isinstance(name, str) else name[0]), rows, columns) as record:
+        record.cache = "hit"
+
+        def miss():
+            record.cache = "miss"
+            return compute()
+        return cache.get(key, name, miss)
+
+
+def timed(name):
+    ## Decorator form of stage() for whole functions (auth and DB calls)
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    ## Local scrape endpoint on a daemon thread; returns the server, or None when disabled
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="eda-metrics", daemon=True).start()
+    return server
@@ -0,0 +1,91 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from sketches import TopK
+
+CHUNK_ROWS = 500_000
+TOP_PATTERNS = 10
+PATTERN_CAPACITY = 1000
+
+
+@dataclass
+class MissingSummary:
+    rows: int
+    null_counts: pd.Series  ## per column, in column order
+    complete_rows: int  ## rows without any missing value
+    patterns: pd.DataFrame  ## most common null patterns: one bool column per feature
+    pattern_rows: np.ndarray  ## rows per pattern, aligned with ``patterns``; kept apart so no feature name can clash
+    pattern_error: int  ## pattern counts are upper bounds, off by at most this much with probability 1 - e^-4
+
+    @property
+    def present_counts(self):
+        return self.rows - self.null_counts
+
+
+def missing_summary(df, top_patterns=TOP_PATTERNS, chunk_rows=CHUNK_ROWS):
+    chunks = (df.iloc[start:start + chunk_rows] for start in range(0, len(df), chunk_rows))
+    return missing_summary_chunks(chunks, df.columns, top_patterns)
+
+
+def missing_summary_chunks(chunks, columns, top_patterns=TOP_PATTERNS):
+    """Null counts and null-pattern frequencies in one vectorized pass over ``chunks``.
+
+    Each row's null mask is packed into bits and used as its pattern
+    signature; signatures are counted with a bounded, mergeable top-k
+    summary so wide frames with many distinct patterns stay cheap.
+    """
+    columns = pd.Index(columns)
+    null_counts = np.zeros(len(columns), dtype=np.int64)
+    rows = complete_rows = 0
+    signatures = TopK(PATTERN_CAPACITY)
+    representatives = {}  ## signature hash -> packed null mask, for signatures still tracked
+    for chunk in chunks:
+        isna = chunk[columns].isna().to_numpy()
+        rows += len(chunk)
+        null_counts += isna.sum(axis=0)
+        has_null = isna.any(axis=1)
+        complete_rows += int(np.count_nonzero(~has_null))
+        packed = np.packbits(isna[has_null], axis=1)
+        if not packed.size:
+            continue
+        hashes = pd.util.hash_pandas_object(pd.DataFrame(packed), index=False).to_numpy()
+        signatures.update(hashes)
+        tracked = signatures.counts.index
+        unseen = tracked[~tracked.isin(list(representatives))]
+        chunk_signatures, first_rows = np.unique(hashes, return_index=True)
+        first_rows = pd.Series(first_rows, index=chunk_signatures).reindex(unseen)
+        for signature, row in first_rows.dropna().astype(int).items():
+            representatives[signature] = packed[row]
+        representatives = {h: representatives[h] for h in tracked if h in representatives}
+    top = signatures.top(top_patterns)
+    masks = [np.unpackbits(representatives[signature])[:len(columns)].astype(bool) for signature, _ in top]
+    patterns = pd.DataFrame(masks, columns=columns) if masks else pd.DataFrame(columns=columns, dtype=bool)
+    return MissingSummary(rows=rows, null_counts=pd.Series(null_counts, index=columns),
+                          complete_rows=complete_rows, patterns=patterns,
+                          pattern_rows=np.array([count for _, count in top], dtype=np.int64),
+                          pattern_error=signatures.error)
+
+
+def missing_bar_chart(summary, title=None):
+    ## One bar per column with its non-null count, as missingno.bar draws it
+    present = summary.present_counts
+    fig = go.Figure(go.Bar(x=[str(c) for c in present.index], y=present.to_numpy(),
+                           customdata=summary.null_counts.to_numpy(),
+                           hovertemplate="%{x}<br>present: %{y}<br>missing: %{customdata}<extra></extra>"))
+    fig.update_layout(title=title, yaxis_title="Non-null rows", yaxis_range=[0, max(summary.rows, 1)])
+    return fig
+
+
+def missing_pattern_chart(summary, title=None):
+    ## Most common null patterns (rows) over the columns that have nulls (columns)
+    columns = summary.null_counts.index[summary.null_counts.to_numpy() > 0]
+    patterns = summary.patterns
+    labels = ["{:,} rows".format(n) for n in summary.pattern_rows]
+    fig = go.Figure(go.Heatmap(z=patterns[columns].to_numpy(dtype=int), x=[str(c) for c in columns], y=labels,
+                               zmin=0, zmax=1, colorscale=[[0, "#e8eef7"], [1, "#1f3b73"]], showscale=False,
+                               hovertemplate="%{x}<br>%{y}<extra></extra>", xgap=1, ygap=1))
+    fig.update_layout(title=title, yaxis_autorange="reversed", height=max(300, 30 * len(labels) + 150))
+    return fig
@@ -1,17 +1,24 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
 import sqlite3
-import bcrypt
 import jwt
 import re
 import os
-import time
-from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-import missingno
+
+import user_store
+from auth_workers import AuthBusy, hash_password, needs_rehash, verify_password
+from dataset_cache import DatasetCache, DEFAULT_MAX_BYTES, dataset_key
+from ingest import ingest_csv, spill_path_for, spill_upload
+from engine import classify_columns
+from instrumentation import ADMIN_EMAILS, begin_run, cached, metrics, run_records, stage, start_metrics_server, timed
+from profiling import PROFILE_MODES, profile_dataframe
+from backends import DuckDBBackend, PandasBackend, choose_backend
+from correlation import HEATMAP_MAX_COLUMNS, correlation_heatmap, top_correlated_pairs
+from missing import missing_bar_chart, missing_pattern_chart
+from charts import HISTOGRAM_BINS, build_relation_chart, category_chart, histogram_chart, histogram_counts, profile_category_counts
+from sampling import CONFIDENCE, SAMPLE_ROWS, Reservoir, category_proportions, mean_ci, proportion_ci, sample_category_counts, weighted_spread
 
 from google_auth_oauthlib.flow import Flow
 import google.auth.transport.requests
@@ -21,65 +28,119 @@ import google.oauth2.id_token
 GOOGLE_CLIENT_SECRETS = "client_secret.json"
 JWT_SECRET = "supersecret"
 JWT_ALGO = "HS256"
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("EDA_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+BACKGROUND_WORKERS = int(os.environ.get("EDA_BACKGROUND_WORKERS", 2))  ## "Compute exact" jobs running at once, across sessions
 
 # --- UTILITY FUNCTIONS ---
 
-def create_correlation_chart(corr_df):
-    fig = plt.figure(figsize=(15, 15))
-    plt.imshow(corr_df.values, cmap="Blues")
-    plt.xticks(range(corr_df.shape[0]), corr_df.columns, rotation=90, fontsize=15)
-    plt.yticks(range(corr_df.shape[0]), corr_df.columns, fontsize=15)
-    plt.colorbar()
-    for i in range(corr_df.shape[0]):
-        for j in range(corr_df.shape[0]):
-            plt.text(i, j, "{:.2f}".format(corr_df.values[i, j]), color="red", ha="center", fontsize=14, fontweight="bold")
-    plt.tight_layout()
-    return fig
-
-def create_missing_values_bar(df):
-    missing_fig = plt.figure(figsize=(10, 5))
-    ax = missing_fig.add_subplot(111)
-    missingno.bar(df, figsize=(10, 5), fontsize=12, ax=ax)
-    return missing_fig
-
-def find_cat_cont_columns(df):
-    cont_columns, cat_columns = [], []
-    for col in df.columns:
-        if len(df[col].unique()) <= 25 or df[col].dtype == object or df[col].dtype == 'O':
-            cat_columns.append(col.strip())
+def find_cat_cont_columns(df, profiles=None):
+    if profiles is None:
+        profiles = profile_dataframe(df)
+    return classify_columns(profiles)
+
+# --- DATASET CACHE ---
+@st.cache_resource
+def get_dataset_cache():
+    ## One cache per server process, shared by every session
+    return DatasetCache(DATASET_CACHE_MAX_BYTES)
+
+def get_dataset_key(upload):
+    ## Hash the upload once per session instead of on every rerun
+    keys = st.session_state.setdefault("dataset_keys", {})
+    if upload.file_id not in keys:
+        keys[upload.file_id] = dataset_key(upload, reader="ingest_csv")
+    return keys[upload.file_id]
+
+def open_backend(upload, key):
+    ## Big files stay on disk behind DuckDB, the rest is loaded into pandas
+    progress_bar = st.progress(0.0, text="Reading file...")
+    progress = lambda done: progress_bar.progress(done, text="Reading file... {:.0f}%".format(100 * done))
+    spill_path = spill_path_for(key)
+    ## The uniform sample is drawn while parsing; it is empty when an earlier spill is reused
+    reservoir = Reservoir(SAMPLE_ROWS)
+    try:
+        if choose_backend(upload.size) == "duckdb":
+            backend = DuckDBBackend(spill_upload(upload, spill_path, progress, reservoir))
         else:
-            cont_columns.append(col.strip())
-    return cont_columns, cat_columns
+            backend = PandasBackend(ingest_csv(upload, spill_path, progress, reservoir), source_path=spill_path)
+    finally:
+        progress_bar.empty()
+    if reservoir.seen:
+        get_dataset_cache().put(key, ("sample", SAMPLE_ROWS, None), reservoir.result())
+    return backend
+
+def dataset_stage(backend, key, name, compute, stage_name=None, columns=None):
+    ## A cached dashboard step, timed as a stage over the dataset's rows
+    return cached(get_dataset_cache(), key, name, compute, stage_name, backend.row_count(),
+                  len(backend.columns) if columns is None else columns)
+
+@st.cache_resource
+def get_background_executor():
+    ## Shared by every session, so exact computations cannot pile up without bound
+    return ThreadPoolExecutor(BACKGROUND_WORKERS, thread_name_prefix="eda-exact")
+
+@st.fragment(run_every=2)
+def exact_job_status(futures):
+    ## Polls the background jobs and reruns the page once they have all finished
+    if all(f.done() for f in futures):
+        st.rerun()
+    st.caption("Computing the exact result on the full data in the background...")
+
+def exact_results(key, jobs, button_key):
+    """Exact results of ``jobs`` ({cache name: compute}) already in the dataset cache, None where missing.
+
+    While any is missing, a "Compute exact" button runs them on the full data
+    in the background; the caller shows its sample result until then.
+    """
+    cache = get_dataset_cache()
+    results = {name: cache.peek(key, name) for name in jobs}
+    futures = [cache.pending(key, name) for name, value in results.items() if value is None]
+    running = [f for f in futures if f is not None and not f.done()]
+    for f in futures:
+        if f is not None and f.done() and f.exception() is not None:
+            st.warning("Exact computation failed: {}".format(f.exception()))
+    if len(futures) and not running and st.button("Compute exact", key=button_key, help="Run on the full data in the background and replace the sample result when done."):
+        running = [cache.submit(key, name, timed("{}_exact".format(name if isinstance(name, str) else name[0]))(jobs[name]), get_background_executor())
+                   for name, value in results.items() if value is None]
+    if running:
+        exact_job_status(running)
+    return results
+
+@st.cache_resource
+def get_metrics_server():
+    ## Started once per server process, only when EDA_METRICS_PORT is set
+    metrics.register_gauge("eda_dataset_cache_bytes", "Estimated bytes held by the dataset cache", lambda: get_dataset_cache().nbytes)
+    return start_metrics_server()
+
+def show_stage_panel():
+    ## Admin-only sidebar view of this run's stages and the process-wide totals
+    with st.sidebar.expander("Stage timings"):
+        records = pd.DataFrame([vars(r) for r in run_records()])
+        if len(records):
+            st.dataframe(records[["stage", "seconds", "cpu_seconds", "cache", "rows", "columns", "max_rss_bytes", "heap_delta_bytes"]], hide_index=True)
+        totals = pd.DataFrame.from_dict(metrics.totals(), orient="index")
+        if len(totals):
+            st.markdown("<span style='font-weight:bold;'>Process totals</span> :", unsafe_allow_html=True)
+            st.dataframe(totals.sort_values("seconds", ascending=False))
+
+def relation_chart_title(chart_type, x_axis, y_axis):
+    if chart_type == "Scatter Plot":
+        return f"{x_axis} vs {y_axis} (Scatter)"
+    if chart_type == "Box Plot":
+        return f"{y_axis} distribution across {x_axis}"
+    return f"{y_axis} vs {x_axis} (Bar)"
 
 # --- DATABASE FUNCTIONS ---
 def get_db_connection():
-    return sqlite3.connect("users.db")
+    ## Kept for callers of the pre-pool API: a plain connection they close themselves.
+    ## The helpers below go through user_store's pool instead.
+    return user_store.connect()
 
+@timed("db.init")
 def init_db():
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE,
-            password_hash TEXT,
-            is_google_user INTEGER DEFAULT 0
-        )
-    """)
-    conn.commit()
-    conn.close()
+    user_store.init_db()
 
 # --- AUTHENTICATION HELPERS ---
-def hash_password(password):
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
-
-def verify_password(password, hashed_password):
-    if not hashed_password:
-        return False
-    if isinstance(hashed_password, str):
-        hashed_password = hashed_password.encode("utf-8")
-    return bcrypt.checkpw(password.encode("utf-8"), hashed_password)
-
 def is_valid_email(email):
     pattern = r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$"
     return re.match(pattern, email) is not None
@@ -106,15 +167,12 @@ def verify_jwt(token):
     except jwt.InvalidTokenError:
         return None
 
+@timed("db.get_email")
 def get_email(user_id):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT email FROM users WHERE id = ?", (user_id,))
-    result = c.fetchone()
-    conn.close()
-    return result[0] if result else "User"
+    return user_store.get_email(user_id) or "User"
 
 # --- EMAIL SIGNUP / LOGIN ---
+@timed("auth.signup")
 def signup(email, password, confirm_password):
     if password != confirm_password:
         return "Passwords do not match."
@@ -122,33 +180,30 @@ def signup(email, password, confirm_password):
         return "Password must be strong (8+ chars, upper, lower, number, symbol)."
     if not is_valid_email(email):
         return "Invalid email."
-    conn = get_db_connection()
-    c = conn.cursor()
     try:
-        hashed_password = hash_password(password)
-        c.execute(
-            "INSERT INTO users (email, password_hash, is_google_user) VALUES (?, ?, 0)",
-            (email, hashed_password),
-        )
-        conn.commit()
-        conn.close()
+        user_store.create_user(email, hash_password(password))
         return "Account created successfully!"
     except sqlite3.IntegrityError:
-        conn.close()
         return "Email already exists."
+    except AuthBusy as e:
+        return str(e)
 
+@timed("auth.login")
 def login(email, password):
-    conn = get_db_connection()
-    c = conn.cursor()
-    c.execute("SELECT id, password_hash, is_google_user FROM users WHERE email = ?", (email,))
-    result = c.fetchone()
-    conn.close()
+    result = user_store.find_user(email)
     if not result:
         return None
     if result[2]:
         st.warning("This account is linked with Google. Use Google login instead.")
         return None
     if verify_password(password, result[1]):
+        if needs_rehash(result[1]):
+            ## The cost factor changed since this hash was made: upgrade it while we have the password.
+            ## Best effort: a busy pool must not turn a correct password into a failed login
+            try:
+                user_store.update_password_hash(result[0], hash_password(password))
+            except AuthBusy:
+                pass
         return create_jwt(result[0])
     return None
 
@@ -190,31 +245,176 @@ def login_with_google():
             if not email:
                 st.error("No email found in Google token.")
                 return
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute("SELECT id FROM users WHERE email = ?", (email,))
-            result = c.fetchone()
-            if not result:
-                c.execute(
-                    "INSERT INTO users (email, password_hash, is_google_user) VALUES (?, NULL, 1)",
-                    (email,),
-                )
-                conn.commit()
-                c.execute("SELECT id FROM users WHERE email = ?", (email,))
-                result = c.fetchone()
-            conn.close()
-            if not result:
+            user_id = user_store.get_or_create_google_user(email)
+            if user_id is None:
                 st.error("Database insert failed for Google user.")
                 return
-            user_id = result[0]
             st.session_state["jwt_token"] = create_jwt(user_id)
             st.success(f"✅ Logged in successfully as **{email}**")
             st.query_params.clear()
-            time.sleep(1)
             st.rerun()
         except Exception as e:
             st.error(f"Google login failed: {e}")
 
+# --- DASHBOARD SECTIONS ---
+## Each section is a fragment: its widgets rerun only that section, and its inputs are
+## passed in explicitly so every heavy result is looked up in the dataset cache by them.
+@st.fragment
+def overview_section(backend, key, cont_columns, cat_columns):
+    st.subheader("1. Dataset")
+    preview = backend.preview()
+    n_rows = backend.row_count()
+    if len(preview) < n_rows:
+        st.caption("First {:,} of {:,} rows.".format(len(preview), n_rows))
+    st.dataframe(preview)
+    n_duplicates, duplicated_rows = dataset_stage(backend, key, "duplicates", backend.duplicates)
+    st.subheader("2. Dataset Overview")
+    st.markdown("<span style='font-weight:bold;'>Rows</span> : {}".format(n_rows), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Duplicates</span> : {}".format(n_duplicates), unsafe_allow_html=True)
+    if n_duplicates:
+        with st.expander("Show duplicated rows"):
+            st.dataframe(duplicated_rows)
+    st.markdown("<span style='font-weight:bold;'>Features</span> : {}".format(len(backend.columns)), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Categorical Columns</span> : {}".format(len(cat_columns)), unsafe_allow_html=True)
+    st.write(cat_columns)
+    st.markdown("<span style='font-weight:bold;'>Continuous Columns</span> : {}".format(len(cont_columns)), unsafe_allow_html=True)
+    st.write(cont_columns)
+
+@st.fragment
+def correlation_section(backend, key, cont_columns):
+    ## cont_columns depends on the profile mode and on sample vs full data, so it is part of every cache name
+    corr_df = dataset_stage(backend, key, ("correlation", tuple(cont_columns)), lambda: backend.correlation(cont_columns), columns=len(cont_columns))
+    st.subheader("3. Correlation Chart")
+    threshold = None
+    if corr_df.shape[0] > HEATMAP_MAX_COLUMNS:
+        st.caption("{} continuous columns: showing up to {} of the most correlated ones, clustered.".format(corr_df.shape[0], HEATMAP_MAX_COLUMNS))
+        threshold = st.slider("Minimum |correlation|", 0.0, 1.0, 0.5, 0.05, key="corr_threshold")
+    fig = dataset_stage(backend, key, ("correlation_heatmap", tuple(cont_columns), threshold), lambda: correlation_heatmap(corr_df, threshold), columns=len(cont_columns))
+    st.plotly_chart(fig, use_container_width=True)
+    st.markdown("<span style='font-weight:bold;'>Most Correlated Pairs</span> :", unsafe_allow_html=True)
+    st.dataframe(dataset_stage(backend, key, ("correlated_pairs", tuple(cont_columns)), lambda: top_correlated_pairs(corr_df), columns=len(cont_columns)), hide_index=True)
+
+@st.fragment
+def missing_section(backend, key):
+    st.subheader("4. Missing Values Distribution")
+    missing = dataset_stage(backend, key, "missing_summary", backend.missing_summary)
+    st.markdown("<span style='font-weight:bold;'>Complete Rows</span> : {} / ({:.2f} %)".format(missing.complete_rows, 100 * missing.complete_rows / max(missing.rows, 1)), unsafe_allow_html=True)
+    st.plotly_chart(dataset_stage(backend, key, "missing_bar_chart", lambda: missing_bar_chart(missing)), use_container_width=True)
+    if len(missing.patterns):
+        st.markdown("<span style='font-weight:bold;'>Most Common Missing-Value Patterns</span> :", unsafe_allow_html=True)
+        st.plotly_chart(dataset_stage(backend, key, "missing_pattern_chart", lambda: missing_pattern_chart(missing)), use_container_width=True)
+
+@st.fragment
+def continuous_feature_section(backend, key, profiles, cont_columns, sample=None, profile_mode="exact"):
+    st.markdown("#### 1. Understand Continuous Feature")
+    feature = st.selectbox(label="Select Continuous Feature", options=cont_columns, key="cont_feature")
+    compute_histogram = lambda: backend.histogram(feature, HISTOGRAM_BINS)
+    if sample is None:
+        profile = profiles[feature]
+        counts, edges = dataset_stage(backend, key, ("histogram", feature, HISTOGRAM_BINS), compute_histogram, columns=1)
+    else:
+        ## Sample estimates until the exact profiles and histogram are in the cache
+        exact = exact_results(key, {("profiles", profile_mode): lambda: backend.profiles(profile_mode),
+                                    ("histogram", feature, HISTOGRAM_BINS): compute_histogram}, button_key="exact_cont_feature")
+        profile = exact[("profiles", profile_mode)][feature] if exact[("profiles", profile_mode)] is not None else None
+        if exact[("histogram", feature, HISTOGRAM_BINS)] is not None:
+            counts, edges = exact[("histogram", feature, HISTOGRAM_BINS)]
+        else:
+            counts, edges = dataset_stage(backend, key, ("sample_histogram", SAMPLE_ROWS, sample.stratify, feature, HISTOGRAM_BINS),
+                                          lambda: histogram_counts(sample.df[feature], HISTOGRAM_BINS, sample.weights), columns=1)
+    if profile is None:
+        sample_feature_stats(sample, profiles[feature])
+    else:
+        exact_feature_stats(profile)
+    with stage("histogram_chart"):
+        hist_fig = histogram_chart(counts, edges, title=f"Distribution of {feature}", x_label=feature)
+    st.plotly_chart(hist_fig, use_container_width=True)
+
+def sample_feature_stats(sample, profile):
+    ## Population estimates from the sample; ± is the half-width of the confidence interval
+    feature = profile.name
+    st.caption("Estimated from a {}; ± is the {:.0%} confidence interval.".format(sample.describe(), CONFIDENCE))
+    missing, missing_half = proportion_ci(sample, sample.df[feature].isna().to_numpy())
+    mean, mean_half = mean_ci(sample, feature)
+    std, quantiles = weighted_spread(sample, feature)
+    st.markdown("<span style='font-weight:bold;'>Count</span> : ~{:.0f}".format(sample.rows * (1 - missing)), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Missing Count</span> : ~{:.0f} / ({:.2f} % ± {:.2f} %)".format(sample.rows * missing, 100 * missing, 100 * missing_half), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Mean</span> : {:.2f} ± {:.2f}".format(mean, mean_half), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Standard Deviation</span> : {:.2f}".format(std), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Minimum in Sample</span> : {}".format(profile.min), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Maximum in Sample</span> : {}".format(profile.max), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Distinct Values in Sample</span> : {}".format(profile.distinct), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Quantiles</span> :", unsafe_allow_html=True)
+    st.write(pd.DataFrame({"{:g}%".format(100 * q): [v] for q, v in quantiles.items()}, index=[feature]))
+
+def exact_feature_stats(profile):
+    st.markdown("<span style='font-weight:bold;'>Count</span> : {}".format(profile.count), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Missing Count</span> : {} / ({:.2f} %)".format(profile.nulls, 100 * profile.nulls / profile.rows), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Mean</span> : {:.2f}".format(profile.mean), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Standard Deviation</span> : {:.2f}".format(profile.std), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Minimum</span> : {}".format(profile.min), unsafe_allow_html=True)
+    st.markdown("<span style='font-weight:bold;'>Maximum</span> : {}".format(profile.max), unsafe_allow_html=True)
+    if profile.errors:
+        st.markdown("<span style='font-weight:bold;'>Distinct Values</span> : ~{} (± {:.1%})".format(profile.distinct, profile.errors["distinct"]), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>Quantiles</span> : (± {:.1%} of rank)".format(profile.errors["quantiles"]), unsafe_allow_html=True)
+    else:
+        st.markdown("<span style='font-weight:bold;'>Distinct Values</span> : {}".format(profile.distinct), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>Quantiles</span> :", unsafe_allow_html=True)
+    st.write(profile.quantile_frame())
+
+@st.fragment
+def categorical_feature_section(backend, key, profiles, cat_columns, sample=None, profile_mode="exact"):
+    st.markdown("#### 2. Understand Categorical Feature")
+    feature = st.selectbox(label="Select Categorical Feature", options=cat_columns, key="cat_feature")
+    compute_counts = lambda: backend.category_counts(feature)
+    if sample is None and profile_mode == "approximate" and "top_values" in profiles[feature].errors:
+        ## Top levels straight from the profile's sketch, no extra pass over the data
+        profile = profiles[feature]
+        st.caption("Approximate counts from a sketch: each is an upper bound, and with about 98% probability at most {} above the true count.".format(profile.errors["top_values"]))
+        df_cnts = profile_category_counts(profile)
+    elif sample is None:
+        df_cnts = dataset_stage(backend, key, ("category_counts", feature), compute_counts, columns=1)
+    else:
+        df_cnts = exact_results(key, {("category_counts", feature): compute_counts}, button_key="exact_cat_feature")[("category_counts", feature)]
+    if df_cnts is None:
+        st.caption("Estimated from a {}; Low and High bound the {:.0%} confidence interval.".format(sample.describe(), CONFIDENCE))
+        shares = dataset_stage(backend, key, ("sample_category_proportions", SAMPLE_ROWS, sample.stratify, feature), lambda: category_proportions(sample, feature), columns=1)
+        st.dataframe(shares.assign(**{c: (100 * shares[c]).round(2) for c in ("Share", "Low", "High")}).rename(columns=lambda c: c if c == "Type" else c + " %"), hide_index=True)
+        df_cnts = dataset_stage(backend, key, ("sample_category_counts", SAMPLE_ROWS, sample.stratify, feature), lambda: sample_category_counts(sample, feature), columns=1)
+    with stage("category_chart"):
+        bar_fig = category_chart(df_cnts, title=f"Distribution of {feature}")
+    st.plotly_chart(bar_fig, use_container_width=True)
+
+@st.fragment
+def relation_section(backend, key, sample=None):
+    columns = backend.columns
+    st.subheader("Explore Relationship Between Features of Dataset")
+    chart_type = st.selectbox("Select Chart Type", ["Scatter Plot", "Box Plot", "Bar Plot"])
+    col1, col2 = st.columns(2)
+    with col1:
+        x_axis = st.selectbox(label="X-Axis", options=columns, index=0, key="x_axis")
+    with col2:
+        y_axis = st.selectbox(label="Y-Axis", options=columns, index=1, key="y_axis")
+    color_encode_opt = [None] + columns
+    color_encode = st.selectbox(label="Color Encode (Optional)", options=color_encode_opt, key="color_encode")
+    name = ("relation_chart", chart_type, x_axis, y_axis, color_encode)
+    title = relation_chart_title(chart_type, x_axis, y_axis)
+    n_columns = len({x_axis, y_axis, color_encode} - {None})
+    compute = lambda: backend.relation_chart(chart_type, x_axis, y_axis, color_encode, title=title)
+    try:
+        if sample is None:
+            fig = dataset_stage(backend, key, name, compute, columns=n_columns)
+        else:
+            fig = exact_results(key, {name: compute}, button_key="exact_relation_chart")[name]
+            if fig is None:
+                st.caption("Drawn from a {}.".format(sample.describe()) + (" Bar heights are reweighted; box and scatter plots show the sampled rows as they are." if sample.stratify is not None else ""))
+                fig = dataset_stage(backend, key, ("sample_relation_chart", SAMPLE_ROWS, sample.stratify) + name[1:],
+                                    lambda: build_relation_chart(sample.df, chart_type, x_axis, y_axis, color_encode, title, sample.weights),
+                                    columns=n_columns)
+        st.plotly_chart(fig, use_container_width=True)
+    except ValueError as e:
+        st.warning(str(e))
+
 # --- DASHBOARD ---
 def show_dashboard(user_id):
     email = get_email(user_id)
@@ -222,85 +422,56 @@ def show_dashboard(user_id):
     if st.sidebar.button("Logout"):
         st.session_state["jwt_token"] = None
         st.rerun()
+    profile_mode = st.sidebar.radio("Column statistics", PROFILE_MODES, format_func=str.capitalize, key="profile_mode",
+                                    help="Approximate mode sketches distinct counts, quantiles and top values; error bounds are shown next to each figure.")
     st.title("📊 EDA Dashboard")
     st.caption("Upload CSV file to see various charts related to EDA. Please upload a file that has both continuous and categorical columns. Once you upload a file, various charts, widgets and basic stats will be displayed.")
     upload = st.file_uploader(label="Upload File Here:", type=["csv"])
     if upload:
-        try:
-            df = pd.read_csv(upload, encoding="utf-8")
-        except UnicodeDecodeError:
-            df = pd.read_csv(upload, encoding="latin1")
-        tab1, tab2, tab3 = st.tabs(["Dataset Overview", "Individual Column Stats", "Relation Between Features"])
-        with tab1:
-            st.subheader("1. Dataset")
-            st.dataframe(df)
-            cont_columns, cat_columns = find_cat_cont_columns(df)
-            st.subheader("2. Dataset Overview")
-            st.markdown("<span style='font-weight:bold;'>Rows</span> : {}".format(df.shape[0]), unsafe_allow_html=True)
-            st.markdown("<span style='font-weight:bold;'>Duplicates</span> : {}".format(df.shape[0] - df.drop_duplicates().shape[0]), unsafe_allow_html=True)
-            st.markdown("<span style='font-weight:bold;'>Features</span> : {}".format(df.shape[1]), unsafe_allow_html=True)
-            st.markdown("<span style='font-weight:bold;'>Categorical Columns</span> : {}".format(len(cat_columns)), unsafe_allow_html=True)
-            st.write(cat_columns)
-            st.markdown("<span style='font-weight:bold;'>Continuous Columns</span> : {}".format(len(cont_columns)), unsafe_allow_html=True)
-            st.write(cont_columns)
-            if cont_columns:
-                corr_df = df[cont_columns].corr()
-                corr_fig = create_correlation_chart(corr_df)
-                st.subheader("3. Correlation Chart")
-                st.pyplot(corr_fig, use_container_width=True)
-            st.subheader("4. Missing Values Distribution")
-            missing_fig = create_missing_values_bar(df)
-            st.pyplot(missing_fig, use_container_width=True)
-        with tab2:
-            df_descr = df.describe()
-            st.subheader("Analyze Individual Feature Distribution")
-            # Continuous features
-            if cont_columns:
-                st.markdown("#### 1. Understand Continuous Feature")
-                feature = st.selectbox(label="Select Continuous Feature", options=cont_columns, key="cont_feature")
-                na_cnt = df[feature].isna().sum()
-                st.markdown("<span style='font-weight:bold;'>Count</span> : {}".format(df_descr[feature]['count']), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Missing Count</span> : {} / ({:.2f} %)".format(na_cnt, 100 * na_cnt/df.shape[0]), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Mean</span> : {:.2f}".format(df_descr[feature]['mean']), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Standard Deviation</span> : {:.2f}".format(df_descr[feature]['std']), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Minimum</span> : {}".format(df_descr[feature]['min']), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Maximum</span> : {}".format(df_descr[feature]['max']), unsafe_allow_html=True)
-                st.markdown("<span style='font-weight:bold;'>Quantiles</span> :", unsafe_allow_html=True)
-                st.write(df_descr[[feature]].T[['25%', "50%", "75%"]])
-                hist_fig = px.histogram(df, x=feature, nbins=50, title=f"Distribution of {feature}")
-                st.plotly_chart(hist_fig, use_container_width=True)
-            # Categorical features
-            if cat_columns:
-                st.markdown("#### 2. Understand Categorical Feature")
-                feature = st.selectbox(label="Select Categorical Feature", options=cat_columns, key="cat_feature")
-                cnts = Counter(df[feature].values)
-                df_cnts = pd.DataFrame({"Type": list(cnts.keys()), "Values": list(cnts.values())})
-                bar_fig = px.bar(df_cnts, x="Type", y="Values", title=f"Distribution of {feature}", color="Values")
-                st.plotly_chart(bar_fig, use_container_width=True)
-        with tab3:
-            st.subheader("Explore Relationship Between Features of Dataset")
-            chart_type = st.selectbox("Select Chart Type", ["Scatter Plot", "Box Plot", "Bar Plot"])
-            col1, col2 = st.columns(2)
-            with col1:
-                x_axis = st.selectbox(label="X-Axis", options=df.columns, index=0, key="x_axis")
-            with col2:
-                y_axis = st.selectbox(label="Y-Axis", options=df.columns, index=1, key="y_axis")
-            color_encode_opt = [None] + list(df.columns)
-            color_encode = st.selectbox(label="Color Encode (Optional)", options=color_encode_opt, key="color_encode")
-            if chart_type == "Scatter Plot":
-                fig = px.scatter(df, x=x_axis, y=y_axis, color=color_encode,
-                                 title=f"{x_axis} vs {y_axis} (Scatter)")
-            elif chart_type == "Box Plot":
-                fig = px.box(df, x=x_axis, y=y_axis, color=color_encode,
-                             title=f"{y_axis} distribution across {x_axis}")
-            elif chart_type == "Bar Plot":
-                fig = px.bar(df, x=x_axis, y=y_axis, color=color_encode, barmode="group",
-                             title=f"{y_axis} vs {x_axis} (Bar)")
-            st.plotly_chart(fig, use_container_width=True)
+        cache = get_dataset_cache()
+        key = get_dataset_key(upload)
+        backend = cached(cache, key, "backend", lambda: open_backend(upload, key), stage_name="parse")
+        sample = None
+        if backend.row_count() > SAMPLE_ROWS:
+            ## Large datasets: Tab 2 statistics and Tab 3 charts come from a sample unless asked otherwise
+            if st.sidebar.radio("Column stats and charts from", ("Sample", "Full data"), key="chart_data",
+                                help="Sample results are shown at once; each one has a button to compute the exact result in the background.") == "Sample":
+                stratify = st.sidebar.selectbox("Stratify sample by", [None] + backend.columns, key="stratify", format_func=lambda c: "None (uniform)" if c is None else c,
+                                                help="Samples each level of this column separately so rare levels are kept; estimates are reweighted.")
+                sample = dataset_stage(backend, key, ("sample", SAMPLE_ROWS, stratify), lambda: backend.sample(SAMPLE_ROWS, stratify))
+        if sample is None:
+            profiles = dataset_stage(backend, key, ("profiles", profile_mode), lambda: backend.profiles(profile_mode))
+            cont_columns, cat_columns = dataset_stage(backend, key, ("cat_cont_columns", profile_mode), lambda: find_cat_cont_columns(None, profiles), stage_name="classify")
+        else:
+            profiles = dataset_stage(backend, key, ("sample_profiles", SAMPLE_ROWS, sample.stratify, profile_mode), lambda: profile_dataframe(sample.df, mode=profile_mode), stage_name="profiles")
+            cont_columns, cat_columns = dataset_stage(backend, key, ("sample_cat_cont_columns", SAMPLE_ROWS, sample.stratify, profile_mode), lambda: find_cat_cont_columns(None, profiles), stage_name="classify")
+        ## Lazy tabs: only the open tab's sections run, switching tabs reruns the script
+        tab1, tab2, tab3 = st.tabs(["Dataset Overview", "Individual Column Stats", "Relation Between Features"],
+                                   key="dashboard_tab", on_change="rerun")
+        if tab1.open:
+            with tab1:
+                overview_section(backend, key, cont_columns, cat_columns)
+                if cont_columns:
+                    correlation_section(backend, key, cont_columns)
+                missing_section(backend, key)
+        if tab2.open:
+            with tab2:
+                st.subheader("Analyze Individual Feature Distribution")
+                if cont_columns:
+                    continuous_feature_section(backend, key, profiles, cont_columns, sample, profile_mode)
+                if cat_columns:
+                    categorical_feature_section(backend, key, profiles, cat_columns, sample, profile_mode)
+        if tab3.open:
+            with tab3:
+                relation_section(backend, key, sample)
+    if email in ADMIN_EMAILS:
+        show_stage_panel()
 
 # --- MAIN APP ---
 def main():
     st.set_page_config(page_title="EDA with Login", layout="wide")
+    begin_run()
+    get_metrics_server()
     init_db()
     if "jwt_token" not in st.session_state:
         st.session_state["jwt_token"] = None
@@ -318,13 +489,14 @@ def main():
             email = st.text_input("Email", key="login_email")
             password = st.text_input("Password", type="password", key="login_pass")
             if st.button("Login"):
-                token = login(email, password)
-                if token:
-                    st.session_state["jwt_token"] = token
-                    st.success("Login successful!")
-                    time.sleep(1)
-                    st.rerun()
+                try:
+                    token = login(email, password)
+                except AuthBusy as e:
+                    st.warning(str(e))
                 else:
+                    if token:
+                        st.session_state["jwt_token"] = token
+                        st.rerun()
                     st.error("Invalid credentials.")
             st.write("---")
             login_with_google()
@@ -0,0 +1,287 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+from sketches import HyperLogLog, KLLSketch, Moments, TopK, hash_values
+
+PROFILE_WORKERS = int(os.environ.get("EDA_PROFILE_WORKERS", os.cpu_count() or 1))
+PROFILE_EXECUTOR = os.environ.get("EDA_PROFILE_EXECUTOR", "thread")  ## "thread", "process" or "serial"
+PROFILE_MODES = ("exact", "approximate")
+MIN_PARALLEL_COLUMNS = 16
+SHARDS_PER_WORKER = 4
+CATEGORICAL_MAX_DISTINCT = 25  ## Columns with at most this many values (NaN included) are categorical
+TOP_K = 10
+SKETCH_CHUNK_ROWS = 1 << 20  ## Rows fed to a ColumnSketch at a time
+QUANTILES = (0.25, 0.5, 0.75)
+
+
+@dataclass
+class ColumnProfile:
+    name: str
+    dtype: str
+    count: int  ## non-null values
+    nulls: int
+    distinct: int  ## non-null distinct values
+    is_numeric: bool
+    mean: float = np.nan
+    std: float = np.nan
+    skew: float = np.nan
+    min: object = None
+    max: object = None
+    quantiles: dict = field(default_factory=dict)  ## {0.25: value, ...}
+    top_values: list = field(default_factory=list)  ## [(value, count), ...] most frequent first
+    errors: dict = field(default_factory=dict)  ## Error bounds of approximate stats; empty when exact
+
+    @property
+    def rows(self):
+        return self.count + self.nulls
+
+    @property
+    def is_categorical(self):
+        return not self.is_numeric or self.distinct + (self.nulls > 0) <= CATEGORICAL_MAX_DISTINCT
+
+    def quantile_frame(self):
+        ## Same shape as df.describe()[[col]].T[["25%", "50%", "75%"]]
+        return pd.DataFrame({"{:g}%".format(100 * q): [v] for q, v in self.quantiles.items()}, index=[self.name])
+
+
+def _sorted_quantile(sorted_values, q):
+    ## Linear interpolation, same as np.quantile / pandas describe
+    position = q * (sorted_values.size - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, sorted_values.size - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def _top_k(values, counts, k):
+    if values.size > k:
+        keep = np.argpartition(-counts, k - 1)[:k]
+        values, counts = values[keep], counts[keep]
+    order = np.lexsort((np.arange(values.size), -counts))
+    return [(v.item() if hasattr(v, "item") else v, int(c)) for v, c in zip(values[order], counts[order])]
+
+
+def profile_numeric(name, series, top_k=TOP_K):
+    ## One sort gives min/max, quantiles, distinct count and value frequencies
+    values = series.to_numpy(dtype="float64", na_value=np.nan)
+    finite = values[~np.isnan(values)]
+    finite.sort()
+    profile = ColumnProfile(name=name, dtype=str(series.dtype), count=int(finite.size),
+                            nulls=int(values.size - finite.size), distinct=0, is_numeric=True)
+    if not finite.size:
+        return profile
+    run_starts = np.concatenate(([0], np.flatnonzero(np.diff(finite)) + 1))
+    run_lengths = np.diff(np.append(run_starts, finite.size))
+    profile.distinct = int(run_starts.size)
+    profile.mean = float(finite.mean())
+    centered = finite - profile.mean
+    m2 = float(np.dot(centered, centered))
+    if finite.size > 1:
+        profile.std = float(np.sqrt(m2 / (finite.size - 1)))
+    if m2 > 0 and finite.size > 2:
+        n = finite.size
+        g1 = np.dot(centered * centered, centered) / n / (m2 / n) ** 1.5
+        profile.skew = float(g1 * np.sqrt(n * (n - 1)) / (n - 2))  ## Sample skewness, as Series.skew()
+    profile.min, profile.max = finite[0].item(), finite[-1].item()
+    if pd.api.types.is_integer_dtype(series.dtype):
+        profile.min, profile.max = int(profile.min), int(profile.max)
+    profile.quantiles = {q: float(_sorted_quantile(finite, q)) for q in QUANTILES}
+    profile.top_values = _top_k(finite[run_starts], run_lengths, top_k)
+    return profile
+
+
+def profile_other(name, series, top_k=TOP_K):
+    counts = series.value_counts(dropna=True, sort=False)
+    nulls = int(series.isna().sum())
+    profile = ColumnProfile(name=name, dtype=str(series.dtype), count=int(series.size - nulls),
+                            nulls=nulls, distinct=int(counts.size), is_numeric=False)
+    profile.top_values = _top_k(counts.index.to_numpy(dtype=object), counts.to_numpy(), top_k)
+    return profile
+
+
+def _is_numeric(dtype):
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+class ColumnSketch:
+    """Mergeable per-column state behind approximate profiles.
+
+    Counts, moments and min/max are exact; distinct values (HyperLogLog),
+    quantiles (KLL) and, for non-numeric columns, top values (Count-Min) are sketched. Feed it one
+    chunk at a time with ``update`` and combine shards with ``merge``.
+    """
+
+    def __init__(self, name, dtype):
+        self.name = name
+        self.dtype = dtype
+        self.is_numeric = _is_numeric(dtype)
+        self.count = 0
+        self.nulls = 0
+        self.hll = HyperLogLog()
+        self.topk = TopK() if not self.is_numeric else None  ## top values are only shown for text columns
+        self.kll = KLLSketch() if self.is_numeric else None
+        self.moments = Moments() if self.is_numeric else None
+
+    def update(self, series):
+        if self.is_numeric:
+            values = series.to_numpy(dtype="float64", na_value=np.nan)
+            values = values[~np.isnan(values)]
+            self.kll.update(values)
+            self.moments.update(values)
+        else:
+            values = series.dropna().to_numpy()
+        self.count += int(values.size)
+        self.nulls += int(series.size - values.size)
+        hashes = hash_values(values)
+        self.hll.update(values, hashes)
+        if self.topk is not None:
+            self.topk.update(values, hashes)
+        return self
+
+    def merge(self, other):
+        self.count += other.count
+        self.nulls += other.nulls
+        self.hll.merge(other.hll)
+        if self.topk is not None:
+            self.topk.merge(other.topk)
+        if self.is_numeric:
+            self.kll.merge(other.kll)
+            self.moments.merge(other.moments)
+        return self
+
+    def to_profile(self, top_k=TOP_K):
+        profile = ColumnProfile(name=self.name, dtype=str(self.dtype), count=self.count, nulls=self.nulls,
+                                distinct=self.hll.estimate() if self.count else 0, is_numeric=self.is_numeric)
+        profile.errors = {"distinct": self.hll.relative_error}
+        if self.topk is not None:
+            profile.top_values = self.topk.top(top_k)
+            profile.errors["top_values"] = self.topk.error
+        if self.is_numeric and self.count:
+            moments = self.moments
+            profile.mean, profile.std, profile.skew = moments.mean, moments.std, moments.skew
+            profile.min, profile.max = moments.min, moments.max
+            if pd.api.types.is_integer_dtype(self.dtype):
+                profile.min, profile.max = int(profile.min), int(profile.max)
+            profile.quantiles = self.kll.quantiles(QUANTILES)
+            profile.errors["quantiles"] = self.kll.rank_error
+        return profile
+
+
+def sketch_chunks(chunks):
+    ## Fold an iterable of DataFrames (e.g. ingestion batches) into one sketch per column
+    sketches = None
+    for chunk in chunks:
+        if sketches is None:
+            sketches = {col: ColumnSketch(col, chunk[col].dtype) for col in chunk.columns}
+        for col in chunk.columns:
+            sketches[col].update(chunk[col])
+    return sketches or {}
+
+
+def profile_column_approx(name, series, top_k=TOP_K):
+    ## A single chunk is cheaper to profile exactly than to sketch, and holds no more memory
+    if len(series) <= SKETCH_CHUNK_ROWS:
+        return profile_column(name, series, top_k)
+    ## Bounded chunks: working memory stays at one chunk's hashes and float copy, whatever the column length
+    sketch = ColumnSketch(name, series.dtype)
+    for start in range(0, len(series), SKETCH_CHUNK_ROWS):
+        sketch.update(series.iloc[start:start + SKETCH_CHUNK_ROWS])
+    return sketch.to_profile(top_k)
+
+
+def profile_column(name, series, top_k=TOP_K):
+    if _is_numeric(series.dtype):
+        return profile_numeric(name, series, top_k)
+    return profile_other(name, series, top_k)
+
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _get_process_pool(workers):
+    ## Kept alive across calls (and Streamlit reruns) so workers are only spawned once
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None or _process_pool._max_workers != workers:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def _reset_process_pool():
+    global _process_pool
+    with _process_pool_lock:
+        _process_pool = None
+
+
+def _profile_parquet_shard(path, columns, top_k, mode):
+    ## Runs in a worker process: only this shard's columns are mapped from the spill file
+    if mode == "approximate":
+        batches = pq.ParquetFile(path, memory_map=True).iter_batches(columns=columns)
+        sketches = sketch_chunks(batch.to_pandas() for batch in batches)
+        return [sketches[col].to_profile(top_k) for col in columns]
+    shard = pq.read_table(path, columns=columns, memory_map=True).to_pandas()
+    return [profile_column(col, shard[col], top_k) for col in columns]
+
+
+def _shards(columns, count):
+    size = max(1, -(-len(columns) // count))
+    return [columns[i:i + size] for i in range(0, len(columns), size)]
+
+
+def _profile_threads(df, top_k, workers, profile_fn):
+    ## Threads see the frame's column buffers directly; numpy sorts release the GIL
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(lambda col: profile_fn(col, df[col], top_k), df.columns))
+
+
+def _profile_processes(source_path, columns, top_k, workers, mode):
+    pool = _get_process_pool(workers)
+    futures = [pool.submit(_profile_parquet_shard, source_path, shard, top_k, mode)
+               for shard in _shards(columns, workers * SHARDS_PER_WORKER)]
+    return [profile for future in futures for profile in future.result()]
+
+
+def profile_dataframe(df, top_k=TOP_K, workers=None, executor=None, source_path=None, mode="exact"):
+    """Profile every column of ``df`` in a single pass per column.
+
+    ``mode="approximate"`` swaps exact distinct counts, quantiles and top
+    values for mergeable sketches (see ``ColumnSketch``), fed
+    ``SKETCH_CHUNK_ROWS`` at a time; each sketched profile then carries its
+    error bounds in ``errors``. Columns that fit in one chunk stay exact.
+
+    Wide frames are sharded by column over ``workers`` threads, or processes
+    when ``executor="process"`` and ``source_path`` points at the dataset's
+    Parquet spill (workers memory-map their own columns instead of receiving
+    pickled buffers). Returns ``{column name: ColumnProfile}`` in column order.
+    """
+    workers = PROFILE_WORKERS if workers is None else workers
+    executor = executor or PROFILE_EXECUTOR
+    profile_fn = profile_column_approx if mode == "approximate" else profile_column
+    columns = list(df.columns)
+    if workers <= 1 or executor == "serial" or len(columns) < MIN_PARALLEL_COLUMNS:
+        return {col: profile_fn(col, df[col], top_k) for col in columns}
+    profiles = None
+    if executor == "process" and pq is not None and source_path and os.path.exists(source_path):
+        try:
+            profiles = _profile_processes(source_path, columns, top_k, workers, mode)
+        except (BrokenProcessPool, OSError):
+            _reset_process_pool()
+    if profiles is None:
+        profiles = _profile_threads(df, top_k, workers, profile_fn)
+    ## Merge in column order whatever order the workers finished in
+    by_name = {profile.name: profile for profile in profiles}
+    return {col: by_name[col] for col in columns}
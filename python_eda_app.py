@@ -1,41 +1,31 @@
 import streamlit as st
-import pandas as pd
-import numpy as np
-from collections import Counter
-import matplotlib.pyplot as plt
-import plotly.express as px
 import plotly.graph_objects as go
 import plotly.figure_factory as ff
-import missingno
-
-def create_correlation_chart(corr_df): ## Create Correlation Chart using Matplotlib
-    fig = plt.figure(figsize=(15,15))
-    plt.imshow(corr_df.values, cmap="Blues")
-    plt.xticks(range(corr_df.shape[0]), corr_df.columns, rotation=90, fontsize=15)
-    plt.yticks(range(corr_df.shape[0]), corr_df.columns, fontsize=15)
-    plt.colorbar()
-
-    for i in range(corr_df.shape[0]):
-        for j in range(corr_df.shape[0]):
-            plt.text(i,j, "{:.2f}".format(corr_df.values[i, j]), color="red", ha="center", fontsize=14, fontweight="bold")
-
-    return fig
-
-def create_missing_values_bar(df):
-    missing_fig = plt.figure(figsize=(10,5))
-    ax = missing_fig.add_subplot(111)
-    missingno.bar(df, figsize=(10,5), fontsize=12, ax=ax)
-
-    return missing_fig
-
-def find_cat_cont_columns(df): ## Logic to Separate Continuous & Categorical Columns
-    cont_columns, cat_columns = [],[]
-    for col in df.columns:        
-        if len(df[col].unique()) <= 25 or df[col].dtype == np.object_: ## If less than 25 unique values
-            cat_columns.append(col.strip())
-        else:
-            cont_columns.append(col.strip())
-    return cont_columns, cat_columns
+import os
+
+from dataset_cache import DatasetCache, DEFAULT_MAX_BYTES, dataset_key
+from ingest import ingest_csv, spill_path_for
+from engine import classify_columns
+from profiling import profile_dataframe
+from duplicates import count_duplicates
+from correlation import correlation_heatmap, correlation_matrix
+from missing import missing_bar_chart, missing_summary
+from charts import HISTOGRAM_BINS, build_relation_chart, category_chart, category_counts, histogram_chart, histogram_counts
+
+def find_cat_cont_columns(df, profiles=None): ## Logic to Separate Continuous & Categorical Columns
+    if profiles is None:
+        profiles = profile_dataframe(df)
+    return classify_columns(profiles)
+
+@st.cache_resource
+def get_dataset_cache(): ## Shared by all sessions of this server process
+    return DatasetCache(int(os.environ.get("EDA_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)))
+
+def get_dataset_key(upload): ## Hash the upload once per session, not on every rerun
+    keys = st.session_state.setdefault("dataset_keys", {})
+    if upload.file_id not in keys:
+        keys[upload.file_id] = dataset_key(upload, reader="ingest_csv")
+    return keys[upload.file_id]
 
 ### Web App / Dashboard Code
 st.set_page_config(page_icon=":bar_chart:", page_title="EDA Automated using Python")
@@ -46,7 +36,9 @@ st.markdown("Please feel free to visit <a href='https://www.youtube.com/watch?v=
 upload = st.file_uploader(label="Upload File Here:", type=["csv"])
 
 if upload: ## File as Bytes
-    df = pd.read_csv(upload)
+    cache = get_dataset_cache()
+    key = get_dataset_key(upload)
+    df = cache.get(key, "df", lambda: ingest_csv(upload, spill_path_for(key)))
 
     tab1, tab2, tab3 = st.tabs(["Dataset Overview :clipboard:", "Individual Column Stats :bar_chart:", "Explore Relation Between Features :chart:"])
 
@@ -54,54 +46,54 @@ if upload: ## File as Bytes
         st.subheader("1. Dataset")
         st.write(df)
 
-        cont_columns, cat_columns = find_cat_cont_columns(df)
+        profiles = cache.get(key, "profiles", lambda: profile_dataframe(df, source_path=spill_path_for(key)))
+        cont_columns, cat_columns = cache.get(key, "cat_cont_columns", lambda: find_cat_cont_columns(df, profiles))
 
         st.subheader("2. Dataset Overview")
         st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Rows", df.shape[0]), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Duplicates", df.shape[0] - df.drop_duplicates().shape[0]), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Duplicates", cache.get(key, "duplicates", lambda: count_duplicates(df))), unsafe_allow_html=True)
         st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Features", df.shape[1]), unsafe_allow_html=True)
         st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Categorical Columns", len(cat_columns)), unsafe_allow_html=True)
         st.write(cat_columns)
         st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Continuous Columns", len(cont_columns)), unsafe_allow_html=True)
         st.write(cont_columns)
         
-        corr_df = df[cont_columns].corr()
-        corr_fig = create_correlation_chart(corr_df)
+        corr_df = cache.get(key, "correlation", lambda: correlation_matrix(df, cont_columns))
+        corr_fig = correlation_heatmap(corr_df)
         
         st.subheader("3. Correlation Chart")
-        st.pyplot(corr_fig, use_container_width=True)
+        st.plotly_chart(corr_fig, use_container_width=True)
 
         st.subheader("4. Missing Values Distribution")
-        missing_fig = create_missing_values_bar(df)
-        st.pyplot(missing_fig, use_container_width=True)
+        missing = cache.get(key, "missing_summary", lambda: missing_summary(df))
+        st.plotly_chart(missing_bar_chart(missing), use_container_width=True)
 
     with tab2: ## Individual Column Stats
-        df_descr = df.describe()
         st.subheader("Analyze Individual Feature Distribution")
 
         st.markdown("#### 1. Understand Continuous Feature")        
         feature = st.selectbox(label="Select Continuous Feature", options=cont_columns, index=0)
 
-        na_cnt = df[feature].isna().sum()
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Count", df_descr[feature]['count']), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {} / ({:.2f} %)".format("Missing Count", na_cnt, na_cnt/df.shape[0]), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {:.2f}".format("Mean", df_descr[feature]['mean']), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {:.2f}".format("Standard Deviation", df_descr[feature]['std']), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Minimum", df_descr[feature]['min']), unsafe_allow_html=True)
-        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Maximum", df_descr[feature]['max']), unsafe_allow_html=True)
+        profile = profiles[feature]
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Count", profile.count), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {} / ({:.2f} %)".format("Missing Count", profile.nulls, profile.nulls / profile.rows), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {:.2f}".format("Mean", profile.mean), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {:.2f}".format("Standard Deviation", profile.std), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Minimum", profile.min), unsafe_allow_html=True)
+        st.markdown("<span style='font-weight:bold;'>{}</span> : {}".format("Maximum", profile.max), unsafe_allow_html=True)
         st.markdown("<span style='font-weight:bold;'>{}</span> :".format("Quantiles"), unsafe_allow_html=True)
-        st.write(df_descr[[feature]].T[['25%', "50%", "75%"]])
+        st.write(profile.quantile_frame())
         
         ## Histogram using Plotly
-        hist_fig = px.histogram(df, x=feature, nbins=50, title=f"Distribution of {feature}")
+        counts, edges = cache.get(key, ("histogram", feature, HISTOGRAM_BINS), lambda: histogram_counts(df[feature], HISTOGRAM_BINS))
+        hist_fig = histogram_chart(counts, edges, title=f"Distribution of {feature}", x_label=feature)
         st.plotly_chart(hist_fig, use_container_width=True)
 
         st.markdown("#### 2. Understand Categorical Feature")
         feature = st.selectbox(label="Select Categorical Feature", options=cat_columns, index=0)
         ### Categorical Columns Distribution        
-        cnts = Counter(df[feature].values)
-        df_cnts = pd.DataFrame({"Type": cnts.keys(), "Values": cnts.values()})
-        bar_fig = px.bar(df_cnts, x="Type", y="Values", title=f"Distribution of {feature}", color="Values")
+        df_cnts = cache.get(key, ("category_counts", feature), lambda: category_counts(df[feature]))
+        bar_fig = category_chart(df_cnts, title=f"Distribution of {feature}")
         st.plotly_chart(bar_fig, use_container_width=True)
 
     with tab3: ## Explore Relation Between Features
@@ -115,11 +107,8 @@ if upload: ## File as Bytes
 
         color_encode = st.selectbox(label="Color-Encode", options=[None,] + cat_columns)
 
-        if color_encode:
-            scatter_fig = px.scatter(df, x=x_axis, y=y_axis, color=color_encode, 
-                                   title=f"{x_axis.capitalize()} vs {y_axis.capitalize()}")
-        else:
-            scatter_fig = px.scatter(df, x=x_axis, y=y_axis, 
-                                   title=f"{x_axis.capitalize()} vs {y_axis.capitalize()}")
+        scatter_fig = cache.get(key, ("scatter_chart", x_axis, y_axis, color_encode),
+                                lambda: build_relation_chart(df, "Scatter Plot", x_axis, y_axis, color_encode,
+                                                             title=f"{x_axis.capitalize()} vs {y_axis.capitalize()}"))
         
         st.plotly_chart(scatter_fig, use_container_width=True)
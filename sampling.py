@@ -0,0 +1,237 @@
+import os
+from dataclasses import dataclass
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+from charts import OTHER_LABEL, TOP_CATEGORIES, category_frame
+from profiling import QUANTILES
+
+SAMPLE_ROWS = int(os.environ.get("EDA_SAMPLE_ROWS", 100_000))  ## Datasets above this default to sampled charts
+MAX_STRATA = 50  ## Levels beyond this share one OTHER_LABEL stratum
+CONFIDENCE = 0.95
+
+
+@dataclass
+class Sample:
+    df: pd.DataFrame
+    weights: np.ndarray  ## population rows each sampled row stands for
+    strata: np.ndarray  ## stratum label per sampled row
+    population: dict  ## stratum label -> population rows
+    stratify: str = None  ## column the strata come from; None for a simple random sample
+
+    @classmethod
+    def uniform(cls, df, rows, label=None):
+        ## A simple random sample of ``rows`` population rows
+        weight = rows / len(df) if len(df) else 0.0
+        return cls(df=df, weights=np.full(len(df), weight), strata=np.full(len(df), label, dtype=object),
+                   population={label: rows})
+
+    @property
+    def rows(self):
+        return sum(self.population.values())
+
+    def describe(self):
+        kind = "stratified on {}".format(self.stratify) if self.stratify is not None else "uniform"
+        return "{} sample of {:,} of {:,} rows".format(kind, len(self.df), self.rows)
+
+
+class Reservoir:
+    """Uniform sample of a stream of DataFrame chunks (Algorithm R, one chunk at a time).
+
+    Every row seen so far is in the sample with probability
+    ``capacity / seen``. Accepted rows are buffered with their slot number
+    and compacted (last write per slot wins) once the buffer doubles.
+    """
+
+    def __init__(self, capacity=SAMPLE_ROWS, seed=0):
+        self.capacity = capacity
+        self.seed = seed
+        self.reset()
+
+    def reset(self):
+        ## Also called by ingest_csv when it restarts parsing with another reader
+        self.rng = np.random.default_rng(self.seed)
+        self.seen = 0
+        self._pieces = []
+        self._buffered = 0
+
+    def update(self, chunk):
+        n = len(chunk)
+        if not n:
+            return self
+        positions = np.arange(self.seen, self.seen + n)
+        slots = np.where(positions < self.capacity, positions, self.rng.integers(0, positions + 1))
+        rows = np.flatnonzero(slots < self.capacity)
+        self.seen += n
+        if rows.size:
+            piece = chunk.iloc[rows]
+            piece.index = slots[rows]
+            self._pieces.append(piece)
+            self._buffered += rows.size
+            if self._buffered > 2 * self.capacity:
+                self._compact()
+        return self
+
+    def _compact(self):
+        ## Even a single piece can hold several rows for the same slot
+        if self._pieces:
+            df = pd.concat(self._pieces) if len(self._pieces) > 1 else self._pieces[0]
+            self._pieces = [df[~df.index.duplicated(keep="last")]]
+        self._buffered = sum(len(p) for p in self._pieces)
+
+    def shrink(self, capacity):
+        ## A uniform subsample of a uniform sample is uniform: keep going with the smaller capacity
+        self._compact()
+        if self._pieces and self._buffered > capacity:
+            df = self._pieces[0]
+            keep = np.sort(self.rng.choice(len(df), capacity, replace=False))
+            df = df.iloc[keep]
+            df.index = np.arange(capacity)
+            self._pieces = [df]
+            self._buffered = capacity
+        self.capacity = capacity
+
+    def frame(self):
+        self._compact()
+        return self._pieces[0].sort_index().reset_index(drop=True) if self._pieces else pd.DataFrame()
+
+    def result(self, label=None):
+        return Sample.uniform(self.frame(), self.seen, label)
+
+
+class StratifiedReservoir:
+    """One reservoir per level of ``column``, sharing ``capacity`` equally.
+
+    Rare levels keep all of their rows instead of a proportional handful;
+    each row's weight (stratum rows / stratum sample) undoes the
+    over-representation in every estimate.
+    """
+
+    def __init__(self, column, capacity=SAMPLE_ROWS, seed=0, max_strata=MAX_STRATA):
+        self.column = column
+        self.capacity = capacity
+        self.seed = seed
+        self.max_strata = max_strata
+        self.reset()
+
+    def reset(self):
+        self.strata = {}  ## label -> Reservoir
+        self.seen = 0
+
+    def _labels(self, chunk):
+        labels = chunk[self.column].astype(object).where(chunk[self.column].notna(), "NaN")
+        if len(self.strata) >= self.max_strata:
+            labels = labels.where(labels.isin(list(self.strata)), OTHER_LABEL)
+        return labels
+
+    def update(self, chunk):
+        self.seen += len(chunk)
+        for label, group in chunk.groupby(self._labels(chunk), sort=False):
+            if label not in self.strata:
+                if len(self.strata) == self.max_strata - 1:
+                    label = OTHER_LABEL
+                if label not in self.strata:
+                    self.strata[label] = Reservoir(self.capacity, seed=self.seed + len(self.strata))
+                    share = max(1, self.capacity // len(self.strata))
+                    for reservoir in self.strata.values():
+                        reservoir.shrink(share)
+            self.strata[label].update(group)
+        return self
+
+    def result(self):
+        parts = [reservoir.result(label) for label, reservoir in self.strata.items()]
+        if not parts:
+            return Sample(df=pd.DataFrame(), weights=np.empty(0), strata=np.empty(0, dtype=object), population={},
+                          stratify=self.column)
+        return Sample(df=pd.concat([p.df for p in parts], ignore_index=True),
+                      weights=np.concatenate([p.weights for p in parts]),
+                      strata=np.concatenate([p.strata for p in parts]),
+                      population={label: p.rows for label, p in zip(self.strata, parts)}, stratify=self.column)
+
+
+def draw_sample(chunks, capacity=SAMPLE_ROWS, stratify=None, seed=0):
+    sampler = Reservoir(capacity, seed) if stratify is None else StratifiedReservoir(stratify, capacity, seed)
+    for chunk in chunks:
+        sampler.update(chunk)
+    return sampler.result()
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def _stratified_mean(sample, values, valid):
+    """Estimate and variance of the population mean of ``values`` over rows where ``valid``.
+
+    Standard stratified estimator with finite population correction; within
+    a stratum, the valid rows are treated as a simple random sample of the
+    stratum's valid rows (domain estimation).
+    """
+    estimate_parts, variance_parts, domain_rows = [], [], []
+    for label, population in sample.population.items():
+        in_stratum = sample.strata == label
+        n = int(in_stratum.sum())
+        y = values[in_stratum & valid]
+        if not n or not y.size:
+            continue
+        rows = population * y.size / n
+        variance = y.var(ddof=1) if y.size > 1 else 0.0
+        estimate_parts.append(rows * y.mean())
+        variance_parts.append(rows ** 2 * (1 - n / population) * variance / y.size)
+        domain_rows.append(rows)
+    total = sum(domain_rows)
+    if not total:
+        return np.nan, np.nan
+    return sum(estimate_parts) / total, sum(variance_parts) / total ** 2
+
+
+def mean_ci(sample, column, confidence=CONFIDENCE):
+    ## (estimated mean, half-width of the confidence interval) of a numeric column
+    values = sample.df[column].to_numpy(dtype="float64", na_value=np.nan)
+    estimate, variance = _stratified_mean(sample, values, ~np.isnan(values))
+    return estimate, _z(confidence) * np.sqrt(variance)
+
+
+def proportion_ci(sample, mask, confidence=CONFIDENCE):
+    ## (estimated share of population rows where ``mask`` holds, half-width)
+    estimate, variance = _stratified_mean(sample, np.asarray(mask, dtype="float64"), np.ones(len(sample.df), bool))
+    return estimate, _z(confidence) * np.sqrt(variance)
+
+
+def weighted_spread(sample, column, quantiles=QUANTILES):
+    ## Population estimates of the standard deviation and quantiles {q: value} of a numeric column
+    values = sample.df[column].to_numpy(dtype="float64", na_value=np.nan)
+    finite = np.isfinite(values)
+    values, weights = values[finite], sample.weights[finite]
+    if not values.size or not weights.sum():
+        return np.nan, {q: np.nan for q in quantiles}
+    mean = np.average(values, weights=weights)
+    std = np.sqrt(np.average((values - mean) ** 2, weights=weights))
+    order = np.argsort(values, kind="stable")
+    cumulative = (np.cumsum(weights[order]) - weights[order] / 2) / weights.sum()
+    return std, {q: float(np.interp(q, cumulative, values[order])) for q in quantiles}
+
+
+def _labels(series):
+    return series.astype(object).where(series.notna(), "NaN")
+
+
+def category_proportions(sample, column, top_n=TOP_CATEGORIES, confidence=CONFIDENCE):
+    ## Estimated share of each frequent level with its confidence interval, most frequent first
+    labels = _labels(sample.df[column])
+    weighted = pd.Series(sample.weights, index=labels.index).groupby(labels).sum().sort_values(ascending=False)
+    rows = []
+    for level in weighted.index[:top_n]:
+        share, half = proportion_ci(sample, (labels == level).to_numpy(), confidence)
+        rows.append({"Type": level, "Share": share, "Low": max(share - half, 0.0), "High": min(share + half, 1.0)})
+    return pd.DataFrame(rows, columns=["Type", "Share", "Low", "High"])
+
+
+def sample_category_counts(sample, column, top_n=TOP_CATEGORIES):
+    ## Same frame as charts.category_counts, with counts scaled up to the population
+    labels = _labels(sample.df[column])
+    weighted = pd.Series(sample.weights, index=labels.index).groupby(labels).sum().sort_values(ascending=False)
+    estimated = weighted.round().astype(np.int64)
+    return category_frame(estimated.iloc[:top_n], estimated.size, sample.rows)
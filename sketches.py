@@ -0,0 +1,260 @@
+import numpy as np
+import pandas as pd
+
+HLL_PRECISION = 14
+KLL_K = 200
+TOPK_CAPACITY = 1000
+TOPK_WIDTH = 1 << 13  ## Count-Min counters per row; power of two
+TOPK_SAMPLE_FACTOR = 4  ## Candidates drawn per chunk, per tracked item
+COUNT_MIN_MULTIPLIERS = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93],
+                                 dtype=np.uint64)  ## Odd constants, one Count-Min row each
+
+
+def hash_values(values):
+    ## 64-bit hashes, stable across processes so sketches built in workers merge
+    return pd.util.hash_array(np.asarray(values), categorize=False)
+
+
+def _bit_length(x):
+    ## Exponent field of the float64 value, corrected where rounding (only possible above 2 ** 53) bumped it up
+    length = ((x.astype("float64").view(np.uint64) >> np.uint64(52)).astype(np.int64) - 1022).clip(0, 64)
+    big = np.flatnonzero(length > 53)
+    if big.size:
+        length[big] -= x[big] < np.left_shift(np.uint64(1), (length[big] - 1).astype(np.uint64))
+    return length
+
+
+class HyperLogLog:
+    """Distinct-count sketch; standard error is 1.04 / sqrt(2 ** precision).
+
+    Small cardinalities fall back to linear counting, which is practically
+    exact well past the 25-value categorical threshold.
+    """
+
+    def __init__(self, precision=HLL_PRECISION):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return float(1.04 / np.sqrt(self.registers.size))
+
+    def update(self, values, hashes=None):
+        hashes = hash_values(values) if hashes is None else hashes
+        if not hashes.size:
+            return self
+        tail_bits = 64 - self.precision
+        index = (hashes >> np.uint64(tail_bits)).astype(np.intp)
+        tail = hashes & np.uint64((1 << tail_bits) - 1)
+        ## Only ranks above their register matter, i.e. tails below 2 ** (tail_bits - register);
+        ## once registers fill up that is a small fraction of the hashes
+        bound = np.left_shift(np.uint64(1), (tail_bits - self.registers.astype(np.int64)).clip(0).astype(np.uint64))
+        raises = tail < bound[index]
+        rank = tail_bits - _bit_length(tail[raises]) + 1
+        ## Sorted (register, rank) keys: the last key of each register's run holds its maximum
+        keys = np.sort((index[raises] << 6) | rank)
+        last = keys[np.append((keys[1:] >> 6) != (keys[:-1] >> 6), True)] if keys.size else keys
+        self.registers[last >> 6] = last & 63
+        return self
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin-Lang-Liberty compactors).
+
+    ``rank_error`` is the usual normalized rank error bound for ``k``
+    (about 1.3% for k=200).
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def rank_error(self):
+        return 2.296 / self.k ** 0.9723
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def _compress(self):
+        while True:
+            over = [h for h, items in enumerate(self.levels) if items.size > self._capacity(h)]
+            if not over:
+                return
+            level = over[0]
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = self.levels[level]
+            if self._capacity(level) == 2:
+                ## The bottom levels of a long stream: compact pair by pair as they fill, no sort needed
+                ## (a random half of a sorted pair is its min or max)
+                pairs = items.size // 2
+                first, second = items[0:2 * pairs:2], items[1:2 * pairs:2]
+                promoted = np.where(self._rng.integers(2, size=pairs, dtype=bool),
+                                    np.maximum(first, second), np.minimum(first, second))
+                self.levels[level] = items[2 * pairs:]
+            else:
+                items = np.sort(items)
+                odd = items.size % 2  ## an odd item out stays behind
+                promoted = items[odd:][self._rng.integers(2)::2]
+                self.levels[level] = items[:odd]
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], promoted))
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if values.size:
+            self.n += values.size
+            self.levels[0] = np.concatenate((self.levels[0], values))
+            self._compress()
+        return self
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], items))
+        self.n += other.n
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        if not self.n:
+            return {q: np.nan for q in qs}
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(level.size, 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+        total = cumulative[-1]
+        return {q: float(items[min(np.searchsorted(cumulative, q * total), items.size - 1)]) for q in qs}
+
+
+class TopK:
+    """Mergeable heavy hitters in bounded memory.
+
+    A Count-Min sketch (``TOPK_WIDTH`` x 4 counters) counts every item, and
+    the ``capacity`` items with the largest estimates are tracked. Tracking
+    candidates come from a uniform subsample of each chunk plus the items
+    already tracked, so no chunk is ever tabulated in full; a heavy hitter
+    can therefore be missed, with probability about e^-4 per chunk for one
+    at 1/capacity of it. Reported counts are upper bounds; with probability
+    1 - e^-4 each is within ``error`` (e / width of the items seen) of the
+    true count.
+    """
+
+    def __init__(self, capacity=TOPK_CAPACITY, width=TOPK_WIDTH, seed=0):
+        self.capacity = capacity
+        self.table = np.zeros((len(COUNT_MIN_MULTIPLIERS), width), dtype=np.int64)
+        self.n = 0
+        self._items = np.empty(0, dtype=object)
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._estimates = np.empty(0, dtype=np.int64)
+        self._rng = np.random.default_rng(seed)
+
+    @property
+    def error(self):
+        return int(np.ceil(np.e * self.n / self.table.shape[1]))
+
+    @property
+    def counts(self):
+        ## Tracked items and their estimated counts
+        return pd.Series(self._estimates, index=pd.Index(self._items), dtype="int64")
+
+    def _cells(self, hashes):
+        ## One multiply-shift hash per row, all derived from the 64-bit item hash
+        shift = np.uint64(64 - int(np.log2(self.table.shape[1])))
+        return [((hashes * m) >> shift).astype(np.intp) for m in COUNT_MIN_MULTIPLIERS]
+
+    def _track(self, items, hashes):
+        new = ~np.isin(hashes, self._hashes)
+        items = np.concatenate((self._items, items[new])) if self._items.size else items[new]
+        hashes = np.concatenate((self._hashes, hashes[new]))
+        estimates = np.min([row[cells] for row, cells in zip(self.table, self._cells(hashes))], axis=0)
+        keep = np.argsort(-estimates, kind="stable")[:self.capacity]
+        self._items, self._hashes, self._estimates = items[keep], hashes[keep], estimates[keep]
+
+    def update(self, values, hashes=None):
+        values = np.asarray(values)
+        if not values.size:
+            return self
+        hashes = hash_values(values) if hashes is None else hashes
+        for row, cells in zip(self.table, self._cells(hashes)):
+            row += np.bincount(cells, minlength=row.size)
+        self.n += values.size
+        ## An item making up 1/capacity of the chunk is missed by this subsample with probability about e^-4
+        draws = TOPK_SAMPLE_FACTOR * self.capacity
+        candidates = self._rng.integers(0, values.size, draws) if values.size > draws else np.arange(values.size)
+        _, first = np.unique(hashes[candidates], return_index=True)
+        candidates = candidates[first]
+        self._track(values[candidates], hashes[candidates])
+        return self
+
+    def merge(self, other):
+        self.table += other.table
+        self.n += other.n
+        self._track(other._items, other._hashes)
+        return self
+
+    def top(self, k):
+        top = self.counts.nlargest(k)
+        return list(zip(top.index.tolist(), top.astype(int).tolist()))
+
+
+class Moments:
+    ## Exact count/mean/M2/M3, merged with Chan et al.'s pairwise update
+    def __init__(self):
+        self.n, self.mean, self.m2, self.m3 = 0, 0.0, 0.0, 0.0
+        self.min, self.max = np.inf, -np.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype="float64")
+        values = values[~np.isnan(values)]
+        if not values.size:
+            return self
+        other = Moments()
+        other.n, other.mean = values.size, float(values.mean())
+        centered = values - other.mean
+        squared = centered * centered
+        other.m2, other.m3 = float(squared.sum()), float(np.dot(squared, centered))
+        other.min, other.max = float(values.min()), float(values.max())
+        return self.merge(other)
+
+    def merge(self, other):
+        if not other.n:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta * delta * self.n * other.n / n
+        m3 = (self.m3 + other.m3 + delta ** 3 * self.n * other.n * (self.n - other.n) / n ** 2
+              + 3 * delta * (self.n * other.m2 - other.n * self.m2) / n)
+        self.mean += delta * other.n / n
+        self.n, self.m2, self.m3 = n, m2, m3
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+        return self
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else np.nan
+
+    @property
+    def skew(self):
+        if self.n < 3 or self.m2 <= 0:
+            return np.nan
+        g1 = self.m3 / self.n / (self.m2 / self.n) ** 1.5
+        return float(g1 * np.sqrt(self.n * (self.n - 1)) / (self.n - 2))
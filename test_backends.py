@@ -0,0 +1,17 @@
+import pandas as pd
+import pytest
+
+from backends import DuckDBBackend, PandasBackend
+
+
+def test_duplicates_have_the_same_shape(tmp_path):
+    pytest.importorskip("duckdb")
+    df = pd.DataFrame({"a": [1, 1, 1, 2, 2, 3], "b": ["x", "x", "x", None, None, "z"]})
+    path = str(tmp_path / "d.parquet")
+    df.to_parquet(path)
+    count, rows = PandasBackend(df).duplicates()
+    duck_count, duck_rows = DuckDBBackend(path).duplicates()
+    assert count == duck_count == 3
+    assert list(duck_rows.columns) == list(rows.columns)
+    key = lambda frame: sorted(map(str, frame.itertuples(index=False)))
+    assert key(duck_rows) == key(rows)
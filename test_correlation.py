@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from correlation import CorrelationAccumulator, correlation_matrix, top_correlated_pairs
+
+
+def _frame(rows=2_000, columns=12, seed=0):
+    rng = np.random.default_rng(seed)
+    base = rng.normal(size=(rows, 3))
+    values = base[:, rng.integers(0, 3, columns)] + rng.normal(scale=0.5, size=(rows, columns)) + 1e4
+    df = pd.DataFrame(values, columns=["c{}".format(i) for i in range(columns)])
+    df = df.mask(rng.random(df.shape) < 0.2)
+    df["constant"] = 1.0
+    df["empty"] = np.nan
+    df["sparse"] = np.where(np.arange(rows) < 1, 3.0, np.nan)  ## one value: no pair reaches two rows
+    return df
+
+
+@pytest.mark.parametrize("block_columns", [4, 256])
+def test_matches_pandas_with_nans(block_columns):
+    df = _frame()
+    expected = df.corr()
+    result = correlation_matrix(df, block_columns=block_columns)
+    pd.testing.assert_frame_equal(result, expected, atol=1e-10)
+
+
+def test_float32_is_close():
+    df = _frame()
+    result = correlation_matrix(df, dtype="float32")
+    np.testing.assert_allclose(result.to_numpy(), df.corr().to_numpy(), atol=1e-4)
+
+
+def test_accumulator_matches_pandas():
+    df = _frame()
+    accumulator = CorrelationAccumulator(df.columns, shift=df.mean())
+    for start in range(0, len(df), 300):
+        accumulator.update(df.iloc[start:start + 300])
+    pd.testing.assert_frame_equal(accumulator.result(), df.corr(), atol=1e-9)
+
+
+def test_top_pairs_are_the_largest_off_diagonal():
+    corr = correlation_matrix(_frame())
+    pairs = top_correlated_pairs(corr, k=5)
+    stacked = corr.where(np.triu(np.ones(corr.shape, bool), k=1)).stack().abs().sort_values(ascending=False)
+    assert pairs["Correlation"].abs().tolist() == pytest.approx(stacked.iloc[:5].tolist())
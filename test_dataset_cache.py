@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_cache import DatasetCache, estimate_nbytes
+from missing import missing_summary
+from profiling import profile_dataframe
+from sampling import Sample
+
+
+def _frame(rows=10_000):
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({"x": rng.normal(size=rows), "s": rng.choice(["a", "b", None], rows)})
+
+
+def test_sample_counts_its_frame_and_weights():
+    df = _frame()
+    sample = Sample.uniform(df, 10 * len(df))
+    assert estimate_nbytes(sample) >= estimate_nbytes(df) + sample.weights.nbytes + sample.strata.nbytes
+
+
+def test_dataclass_artifacts_are_not_counted_as_pointers():
+    df = _frame()
+    assert estimate_nbytes(missing_summary(df)) > estimate_nbytes(missing_summary(df).null_counts)
+    profiles = profile_dataframe(df)
+    assert estimate_nbytes(profiles) > sum(estimate_nbytes(p.top_values) for p in profiles.values())
+
+
+def _blob(kb):
+    return np.zeros(kb * 1024, dtype=np.uint8)
+
+
+def test_derived_artifacts_are_evicted_least_recently_used_first():
+    cache = DatasetCache(max_bytes=35 * 1024)
+    for name in ("a", "b", "c"):
+        cache.put("k", name, _blob(10))
+    cache.get("k", "a", lambda: None)  ## "b" is now the least recently used
+    cache.put("k", "d", _blob(10))
+    assert [cache.peek("k", name) is not None for name in "abcd"] == [True, False, True, True]
+
+
+def test_pinned_frame_is_kept_while_derived_artifacts_go():
+    cache = DatasetCache(max_bytes=15 * 1024)
+    cache.put("old", "df", _blob(10))
+    cache.put("old", "stats", _blob(10))
+    cache.put("new", "df", _blob(10))
+    ## The older dataset's derived artifact goes first, its frame stays
+    assert "old" in cache and cache.peek("old", "stats") is None and cache.peek("old", "df") is not None
+    cache.put("new", "stats", _blob(10))
+    ## Nothing derived left to evict: the older dataset goes whole
+    assert "old" not in cache and cache.peek("new", "stats") is not None
+
+
+def test_frame_larger_than_the_budget_keeps_its_derived_artifacts():
+    cache = DatasetCache(max_bytes=25 * 1024)
+    cache.put("k", "df", _blob(100))
+    cache.put("k", "a", _blob(10))
+    cache.put("k", "b", _blob(10))
+    assert all(cache.peek("k", name) is not None for name in ("df", "a", "b"))
+    cache.put("k", "c", _blob(10))
+    assert cache.peek("k", "a") is None and cache.peek("k", "df") is not None
+
+
+def test_key_locks_are_released_after_compute():
+    cache = DatasetCache()
+    for i in range(100):
+        cache.get("k", ("histogram", i), lambda: i)
+    with pytest.raises(ZeroDivisionError):
+        cache.get("k", "broken", lambda: 1 / 0)
+    assert not cache._key_locks
+    assert cache.get("k", ("histogram", 3), lambda: None) == 3
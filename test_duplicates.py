@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import duplicates
+from duplicates import count_duplicates, duplicate_mask
+
+
+def _frame(seed, rows=500):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"a": rng.integers(0, 4, rows), "b": rng.choice(["x", "y", None], rows),
+                       "c": rng.integers(0, 3, rows).astype(float)})
+    df.loc[rng.random(rows) < 0.1, "c"] = np.nan
+    return df
+
+
+@pytest.fixture
+def copy_on_write():
+    ## pandas 3 behaviour on pandas 2 too: arrays taken from results are read-only
+    if int(pd.__version__.split(".")[0]) >= 3:
+        yield
+    else:
+        with pd.option_context("mode.copy_on_write", True):
+            yield
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_matches_pandas(seed):
+    df = _frame(seed)
+    assert (duplicate_mask(df, chunk_rows=64) == df.duplicated().to_numpy()).all()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_hash_collisions_are_settled_row_by_row(seed, monkeypatch, copy_on_write):
+    ## Seven hash values for every row: most equal hashes are collisions, not duplicates
+    real_row_hashes = duplicates.row_hashes
+    monkeypatch.setattr(duplicates, "row_hashes", lambda chunk: real_row_hashes(chunk) % np.uint64(7))
+    df = _frame(seed)
+    assert (duplicate_mask(df, chunk_rows=64) == df.duplicated().to_numpy()).all()
+    assert count_duplicates(df) == len(df) - len(df.drop_duplicates())
+
+
+def test_candidates_are_fetched_in_bounded_batches(monkeypatch):
+    monkeypatch.setattr(duplicates, "VERIFY_ROWS", 16)
+    df = _frame(0)
+    sizes = []
+
+    def fetch_rows(positions):
+        sizes.append(len(positions))
+        return df.iloc[positions]
+
+    counter = duplicates.DuplicateCounter().update(df)
+    assert (counter.duplicated(fetch_rows) == df.duplicated().to_numpy()).all()
+    assert sum(sizes) == 2 * counter.count()
+    assert max(sizes) <= 16
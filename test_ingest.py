@@ -0,0 +1,51 @@
+import io
+import os
+
+import pytest
+
+import ingest
+from ingest import SNIFF_BYTES, ingest_csv, spill_upload
+
+## Plain ASCII well past the sniffed prefix, then one latin-1 byte still inside the first Arrow block
+LATIN1_AFTER_PREFIX = (b"name,v\n" + b"".join(b"cafe%d,%d\n" % (i, i) for i in range(SNIFF_BYTES // 8))
+                       + b"caf\xe9,1\n")
+
+
+@pytest.fixture(autouse=True)
+def spill_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "SPILL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_latin1_after_sniffed_prefix(spill_dir):
+    df = ingest_csv(io.BytesIO(LATIN1_AFTER_PREFIX), str(spill_dir / "a.parquet"))
+    assert df["name"].iloc[0] == "cafe0"
+    assert df["name"].iloc[-1] == "café"
+
+
+def test_latin1_after_sniffed_prefix_without_spill():
+    df = ingest_csv(io.BytesIO(LATIN1_AFTER_PREFIX))
+    assert df["name"].iloc[-1] == "café"
+
+
+def test_latin1_after_sniffed_prefix_spill_is_text(spill_dir):
+    pq = pytest.importorskip("pyarrow.parquet")
+    path = spill_upload(io.BytesIO(LATIN1_AFTER_PREFIX), str(spill_dir / "b.parquet"))
+    column = pq.read_table(path).column("name")
+    assert column.type == "string"
+    assert column[-1].as_py() == "café"
+
+
+def test_prune_keeps_held_spills(spill_dir):
+    old, new = spill_dir / "old.parquet", spill_dir / "new.parquet"
+    for i, path in enumerate((old, new)):
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (i, i))
+    ingest.hold_spill(str(old))
+    try:
+        ingest.prune_spill_dir(max_bytes=150)
+        assert old.exists() and new.exists()
+    finally:
+        ingest.release_spill(str(old))
+    ingest.prune_spill_dir(max_bytes=150)
+    assert not old.exists() and new.exists()
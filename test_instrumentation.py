@@ -0,0 +1,77 @@
+import pytest
+
+import instrumentation
+from dataset_cache import DatasetCache
+from instrumentation import StageMetrics, StageRecord, begin_run, cached, run_records, stage, timed
+
+
+def _records(name):
+    return [r for r in instrumentation.metrics.recent if r.stage == name]
+
+
+def test_stage_records_timing_and_shape():
+    begin_run()
+    with stage("test_shape", rows=10, columns=3) as record:
+        sum(range(10_000))
+    assert record.seconds > 0 and record.cpu_seconds >= 0
+    assert record.max_rss_bytes > 0
+    assert (record.rows, record.columns, record.cache, record.error) == (10, 3, None, None)
+    assert run_records() == [record]
+
+
+def test_stage_records_the_error_and_reraises():
+    with pytest.raises(KeyError):
+        with stage("test_error"):
+            raise KeyError("x")
+    assert _records("test_error")[-1].error == "KeyError"
+
+
+def test_cached_records_a_miss_then_a_hit():
+    cache = DatasetCache(1 << 20)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return 42
+
+    begin_run()
+    assert cached(cache, "k", ("test_cached", 1), compute) == 42
+    assert cached(cache, "k", ("test_cached", 1), compute) == 42
+    assert calls == [1]
+    assert [r.cache for r in run_records()] == ["miss", "hit"]
+    assert [r.stage for r in run_records()] == ["test_cached", "test_cached"]
+
+
+def test_timed_wraps_the_function_in_a_stage():
+    @timed("test_timed")
+    def double(x):
+        return 2 * x
+
+    before = len(_records("test_timed"))
+    assert double(4) == 8
+    assert len(_records("test_timed")) == before + 1
+
+
+def test_run_records_are_per_thread_and_per_run():
+    begin_run()
+    with stage("test_run"):
+        pass
+    begin_run()
+    assert run_records() == []
+
+
+def test_totals_and_prometheus_text():
+    m = StageMetrics(recent=2)
+    m.add(StageRecord("load", 0, seconds=1.0, cache="miss"))
+    m.add(StageRecord("load", 0, seconds=3.0, cache="hit"))
+    m.add(StageRecord('a"b', 0, seconds=0.5, error="ValueError"))
+    totals = m.totals()
+    assert totals["load"] == {"calls": 2, "seconds": 4.0, "cpu_seconds": 0.0, "max_seconds": 3.0,
+                              "hits": 1, "misses": 1, "errors": 0}
+    assert totals['a"b']["errors"] == 1
+    assert len(m.recent) == 2
+    text = m.prometheus_text()
+    assert 'eda_stage_calls_total{stage="load"} 2' in text
+    assert 'eda_stage_max_seconds{stage="load"} 3.0' in text
+    assert 'eda_stage_errors_total{stage="a\\"b"} 1' in text
+    assert "# TYPE eda_process_max_rss_bytes gauge" in text
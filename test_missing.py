@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from missing import missing_pattern_chart, missing_summary
+
+
+def test_feature_named_rows_keeps_its_pattern_flags():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Rows": rng.normal(size=1000), "b": rng.normal(size=1000)})
+    df.loc[rng.random(1000) < 0.3, "Rows"] = np.nan
+    df.loc[rng.random(1000) < 0.1, "b"] = np.nan
+    summary = missing_summary(df, chunk_rows=128)
+    exact = df.isna()[df.isna().any(axis=1)].value_counts()
+    assert summary.patterns["Rows"].dtype == bool
+    found = {tuple(flags): rows for flags, rows in zip(summary.patterns.itertuples(index=False), summary.pattern_rows)}
+    assert found == {flags: rows for flags, rows in exact.items()}
+    assert len(missing_pattern_chart(summary).data[0].y) == len(summary.patterns)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from sampling import Reservoir, draw_sample, mean_ci, proportion_ci
+
+
+def _chunks(df, size):
+    return [df.iloc[start:start + size] for start in range(0, len(df), size)]
+
+
+def _population(rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    group = rng.choice(["common", "rare"], rows, p=[0.95, 0.05])
+    value = rng.gamma(4.0, size=rows) + np.where(group == "rare", 5.0, 0.0)
+    value[rng.random(rows) < 0.1] = np.nan
+    return pd.DataFrame({"id": np.arange(rows), "group": group, "value": value})
+
+
+def test_reservoir_includes_every_row_with_equal_probability():
+    df = pd.DataFrame({"id": np.arange(400)})
+    trials, capacity = 300, 40
+    included = np.zeros(len(df))
+    for seed in range(trials):
+        sampler = Reservoir(capacity, seed=seed)
+        for chunk in _chunks(df, 37):
+            sampler.update(chunk)
+        ids = sampler.frame()["id"].to_numpy()
+        assert ids.size == capacity and np.unique(ids).size == capacity
+        included[ids] += 1
+    share = included / trials
+    expected = capacity / len(df)
+    assert np.abs(share - expected).max() < 5 * np.sqrt(expected * (1 - expected) / trials)
+    ## No drift between early and late rows
+    assert abs(share[:200].mean() - share[200:].mean()) < 0.01
+
+
+def test_stratified_sample_keeps_rare_levels_and_population():
+    df = _population()
+    sample = draw_sample(_chunks(df, 1000), capacity=1000, stratify="group")
+    assert sample.rows == len(df)
+    assert sample.weights.sum() == pytest.approx(len(df))
+    assert (sample.df["group"] == "rare").sum() == min(500, (df["group"] == "rare").sum())
+
+
+@pytest.mark.parametrize("stratify", [None, "group"])
+def test_confidence_intervals_cover_the_population_value(stratify):
+    df = _population()
+    true_mean = df["value"].mean()
+    true_share = df["value"].isna().mean()
+    trials, mean_hits, share_hits = 200, 0, 0
+    for seed in range(trials):
+        sample = draw_sample(_chunks(df, 2500), capacity=250, stratify=stratify, seed=seed)
+        mean, half = mean_ci(sample, "value")
+        mean_hits += abs(mean - true_mean) <= half
+        share, half = proportion_ci(sample, sample.df["value"].isna().to_numpy())
+        share_hits += abs(share - true_share) <= half
+    ## Nominal 95%; 200 trials put the observed rate within about 3 points of it
+    assert mean_hits / trials >= 0.9
+    assert share_hits / trials >= 0.9
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import profiling
+from sketches import HyperLogLog, KLLSketch, Moments, TopK, _bit_length, hash_values
+
+
+def _chunks(values, size):
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def test_bit_length_matches_python():
+    rng = np.random.default_rng(0)
+    x = rng.integers(0, 2 ** 63, 10_000, dtype=np.uint64) >> rng.integers(0, 64, 10_000).astype(np.uint64)
+    x = np.concatenate((x, np.array([0, 1, 2 ** 53 - 1, 2 ** 53 + 1, 2 ** 64 - 1], dtype=np.uint64)))
+    assert _bit_length(x).tolist() == [int(v).bit_length() for v in x]
+
+
+@pytest.mark.parametrize("distinct", [10, 1_000, 200_000])
+def test_hyperloglog_within_error(distinct):
+    values = np.random.default_rng(distinct).integers(0, distinct, 500_000)
+    hll = HyperLogLog()
+    for chunk in _chunks(values, 65_536):
+        hll.update(chunk)
+    exact = np.unique(values).size
+    assert abs(hll.estimate() - exact) <= 3 * hll.relative_error * exact
+
+
+def test_hyperloglog_merge_equals_one_pass():
+    values = np.random.default_rng(1).integers(0, 50_000, 100_000)
+    left, right = HyperLogLog().update(values[:30_000]), HyperLogLog().update(values[30_000:])
+    assert (left.merge(right).registers == HyperLogLog().update(values).registers).all()
+
+
+@pytest.mark.parametrize("chunk_rows", [1_000, 100_000, 1_000_000])
+def test_kll_quantiles_within_rank_error(chunk_rows):
+    values = np.random.default_rng(2).lognormal(size=1_000_000)
+    kll = KLLSketch()
+    for chunk in _chunks(values, chunk_rows):
+        kll.update(chunk)
+    ordered = np.sort(values)
+    for q, estimate in kll.quantiles((0.01, 0.25, 0.5, 0.75, 0.99)).items():
+        rank = np.searchsorted(ordered, estimate) / ordered.size
+        assert abs(rank - q) <= kll.rank_error
+
+
+def test_kll_merge_keeps_rank_error():
+    values = np.random.default_rng(3).normal(size=400_000)
+    kll = KLLSketch()
+    for chunk in _chunks(values, 50_000):
+        kll.merge(KLLSketch(seed=len(kll.levels)).update(chunk))
+    assert kll.n == values.size
+    ordered = np.sort(values)
+    for q, estimate in kll.quantiles((0.1, 0.5, 0.9)).items():
+        assert abs(np.searchsorted(ordered, estimate) / ordered.size - q) <= kll.rank_error
+
+
+def test_topk_counts_are_bounded_upper_estimates():
+    values = np.random.default_rng(4).zipf(1.3, 500_000).astype(str).astype(object)
+    topk = TopK()
+    for chunk in _chunks(values, 100_000):
+        topk.update(chunk)
+    exact = pd.Series(values).value_counts()
+    top = topk.top(10)
+    assert [value for value, _ in top] == exact.index[:10].tolist()
+    for value, count in top:
+        assert exact[value] <= count <= exact[value] + topk.error
+
+
+def test_topk_merge_matches_one_pass():
+    values = np.random.default_rng(5).zipf(1.5, 200_000)
+    merged = TopK().update(values[:80_000]).merge(TopK().update(values[80_000:]))
+    assert [value for value, _ in merged.top(5)] == pd.Series(values).value_counts().index[:5].tolist()
+    assert merged.n == values.size
+
+
+def test_moments_merge_matches_pandas():
+    values = np.random.default_rng(6).gamma(2.0, size=10_000)
+    moments = Moments()
+    for chunk in _chunks(values, 999):
+        moments.merge(Moments().update(chunk))
+    series = pd.Series(values)
+    assert moments.mean == pytest.approx(series.mean())
+    assert moments.std == pytest.approx(series.std())
+    assert moments.skew == pytest.approx(series.skew())
+
+
+def test_profile_column_approx_sketches_only_past_one_chunk(monkeypatch):
+    series = pd.Series(np.random.default_rng(7).integers(0, 500, 20_000).astype(float), name="x")
+    series[::7] = np.nan
+    assert profiling.profile_column_approx("x", series) == profiling.profile_column("x", series)
+    monkeypatch.setattr(profiling, "SKETCH_CHUNK_ROWS", 4_096)
+    profile = profiling.profile_column_approx("x", series)
+    assert set(profile.errors) == {"distinct", "quantiles"}
+    assert (profile.count, profile.nulls) == (series.count(), series.isna().sum())
+    assert abs(profile.distinct - series.nunique()) <= 3 * profile.errors["distinct"] * series.nunique()
+
+
+def test_hash_values_are_stable():
+    assert hash_values(np.array(["a", "b"], dtype=object)).tolist() == hash_values(np.array(["a", "b"], dtype=object)).tolist()
@@ -0,0 +1,160 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+USERS_DB = os.environ.get("EDA_USERS_DB", "users.db")
+POOL_SIZE = int(os.environ.get("EDA_DB_POOL_SIZE", 8))
+BUSY_TIMEOUT = 5.0  ## seconds a writer waits on a locked database before "database is locked"
+EMAIL_CACHE_TTL = 60.0
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        email TEXT UNIQUE,
+        password_hash TEXT,
+        is_google_user INTEGER DEFAULT 0
+    )
+"""
+## Fixed statement texts: sqlite3 keeps each pooled connection's prepared statements keyed by SQL
+SELECT_EMAIL = "SELECT email FROM users WHERE id = ?"
+SELECT_USER = "SELECT id, password_hash, is_google_user FROM users WHERE email = ?"
+SELECT_USER_ID = "SELECT id FROM users WHERE email = ?"
+INSERT_USER = "INSERT INTO users (email, password_hash, is_google_user) VALUES (?, ?, ?)"
+UPDATE_PASSWORD_HASH = "UPDATE users SET password_hash = ? WHERE id = ?"
+INSERT_GOOGLE_USER = "INSERT OR IGNORE INTO users (email, password_hash, is_google_user) VALUES (?, NULL, 1)"
+
+
+class ConnectionPool:
+    """A fixed-size pool of SQLite connections in WAL mode, shared by all script threads.
+
+    WAL lets readers run alongside the single writer; the busy timeout makes
+    concurrent writers wait for the lock instead of failing.
+    """
+
+    def __init__(self, path=USERS_DB, size=POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, check_same_thread=False, cached_statements=64)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        ## Commits on success, rolls back on error; waits for a free slot when all are in use
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                with conn:
+                    yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class TTLCache:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[1] < time.monotonic():
+                self._items.pop(key, None)
+                return None
+            return item[0]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (value, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+_emails = TTLCache(EMAIL_CACHE_TTL)
+
+
+def get_pool():
+    ## The pool and the schema are set up once per process, not on every rerun
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                pool = ConnectionPool()
+                with pool.connection() as conn:
+                    conn.execute(SCHEMA)
+                _pool = pool
+    return _pool
+
+
+def connection():
+    return get_pool().connection()
+
+
+def connect():
+    ## A standalone connection set up like the pooled ones (WAL, busy timeout); the caller closes it
+    return get_pool()._connect()
+
+
+def init_db():
+    get_pool()
+
+
+def get_email(user_id):
+    email = _emails.get(user_id)
+    if email is None:
+        with connection() as conn:
+            result = conn.execute(SELECT_EMAIL, (user_id,)).fetchone()
+        if not result:
+            return None
+        email = result[0]
+        _emails.put(user_id, email)
+    return email
+
+
+def find_user(email):
+    ## (id, password_hash, is_google_user) or None
+    with connection() as conn:
+        return conn.execute(SELECT_USER, (email,)).fetchone()
+
+
+def create_user(email, password_hash, is_google_user=False):
+    ## Raises sqlite3.IntegrityError when the email is taken
+    with connection() as conn:
+        return conn.execute(INSERT_USER, (email, password_hash, int(is_google_user))).lastrowid
+
+
+def update_password_hash(user_id, password_hash):
+    with connection() as conn:
+        conn.execute(UPDATE_PASSWORD_HASH, (password_hash, user_id))
+
+
+def get_or_create_google_user(email):
+    with connection() as conn:
+        conn.execute(INSERT_GOOGLE_USER, (email,))
+        result = conn.execute(SELECT_USER_ID, (email,)).fetchone()
+    return result[0] if result else None